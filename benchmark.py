@@ -0,0 +1,285 @@
+"""
+End-to-end benchmark of the File Organizer pipeline.
+
+Builds a reproducible synthetic corpus of contract ZIPs (nested ZIPs, PDFs
+carrying the anchor phrases of dt.folder_categories, MSG and office files,
+long filenames), then times step_1, step_2 and step_3 separately for each
+corpus size and writes the results as JSON.
+
+Usage:
+    python benchmark.py --sizes 10 50 200 --output benchmark_results.json
+"""
+import io # This module provides in-memory byte streams, used to build nested ZIPs
+import os # This module provides functions for interacting with the operating system
+import sys # This module provides access to interpreter information for the results header
+import json # This module provides an easy way to encode and decode data in JSON format
+import time # This module provides the clocks used to time each step
+import random # This module provides the seeded generator that makes the corpus reproducible
+import shutil # This module provides a higher-level interface for file operations, such as removing folders
+import logging # This module provides a flexible framework for emitting log messages from Python programs
+import zipfile # This module provides tools to create, read, write, append, and list a ZIP file
+import argparse # This module parses the command line options
+import platform # This module describes the machine the benchmark ran on
+import tempfile # This module provides the scratch folder the corpus is built in
+from datetime import date, datetime, timedelta # This module provides classes for manipulating dates and times
+import data as dt # This module contains data structures and constants used in the script
+import functions as fn # This module contains the pipeline steps being measured
+
+
+# ================================================================================
+# Synthetic documents
+# ================================================================================
+
+FILLER = (
+    "The parties agree to the terms and conditions set forth herein. Each party shall perform "
+    "its obligations in a timely manner and in accordance with applicable law."
+)
+
+def make_pdf(pages: list) -> bytes:
+    """
+    Build a minimal, valid PDF where each page is a list of text lines set
+    in Helvetica. Good enough for pdfplumber to extract the text back.
+    """
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    next_id = 4
+    for lines in pages:
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        kids.append(f"{page_id} 0 R")
+
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 750 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("cp1252", "replace")
+
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>").encode()
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in range(1, next_id):
+        offsets[obj_id] = out.tell()
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id]))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % next_id)
+    for obj_id in range(1, next_id):
+        out.write(b"%010d 00000 n \n" % offsets[obj_id])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, xref))
+    return out.getvalue()
+
+def filler_pages(rnd: random.Random, max_pages: int) -> list:
+    """Between 0 and `max_pages` pages of body text."""
+    return [[FILLER] * 40 for _ in range(rnd.randint(0, max_pages))]
+
+def office_file() -> bytes:
+    """A small ZIP container standing in for a DOCX/XLSX file."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as office:
+        office.writestr("[Content_Types].xml", "<Types/>")
+    return buffer.getvalue()
+
+def msg_file(rnd: random.Random) -> bytes:
+    """Bytes with the OLE2 signature used by Outlook .msg files."""
+    return b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + bytes(rnd.getrandbits(8) for _ in range(2048))
+
+
+# ================================================================================
+# Corpus generator
+# ================================================================================
+
+def random_date(rnd: random.Random) -> str:
+    day = date(2015, 1, 1) + timedelta(days=rnd.randint(0, 3650))
+    return day.strftime("%B %d, %Y").replace(" 0", " ")
+
+def contract_members(rnd: random.Random, contract_id: str, max_pages: int) -> dict:
+    """Return {archive member name: bytes} for one contract ZIP."""
+    members = {}
+    base_agreements = dt.folder_categories["Base Service Agreement"]
+    countries = sorted(dt.countries)
+
+    # Base agreement (BSA, MSA, SSA, ... but not LIA)
+    kind = rnd.choice([k for k in base_agreements if k != "LIA"])
+    rules = base_agreements[kind]
+    title = rnd.choice(rules["file_category_extraction"])
+    anchor = rules["date_extraction"][0]
+    members[f"{contract_id}/{contract_id}_{kind}_signed.pdf"] = make_pdf(
+        [[title.upper(), f"{anchor}{random_date(rnd)}."]] + filler_pages(rnd, max_pages))
+
+    # Amendments with trailing numbers
+    amendment = dt.folder_categories["Contract Amendments"]["Contract Amendment"]
+    for number in range(1, rnd.randint(1, 4)):
+        members[f"{contract_id}/Amendment {number} executed.pdf"] = make_pdf(
+            [["AMENDMENT TO AGREEMENT",
+              f"{amendment['trailing_number_extraction'][0]}{number}",
+              f"{amendment['date_extraction'][0]}{random_date(rnd)}"]] + filler_pages(rnd, 2))
+
+    # Local Implementation Agreements with country anchors
+    lia = base_agreements["LIA"]
+    for _ in range(rnd.randint(0, 4)):
+        country = rnd.choice(countries)
+        members[f"{contract_id}/LIA_{country.replace(' ', '_')}_{rnd.randint(100, 999)}.pdf"] = make_pdf(
+            [[f"{lia['country_extraction'][0]}{country}",
+              f"{lia['date_extraction'][0]}{random_date(rnd)}"]] + filler_pages(rnd, 3))
+
+    # Extension letter and generic supporting documents
+    if rnd.random() < 0.5:
+        extension = dt.folder_categories["Supporting Documents"]["Extension Letter"]
+        members[f"{contract_id}/Renewal letter.pdf"] = make_pdf(
+            [[extension["file_category_extraction"][0], f"through {random_date(rnd)}"]])
+    for name in ("Risk memo", "Payment approval", "SOW", "DnB report", "Scan"):
+        members[f"{contract_id}/{name} {rnd.randint(1, 28)}.{rnd.randint(1, 12)}.2023.pdf"] = make_pdf(
+            [[f"{name} {FILLER}"]])
+
+    # Long scanner names sharing a prefix
+    long_prefix = "Scanned contract document from the shared multifunction printer in building " * 2
+    for copy in range(rnd.randint(0, 3)):
+        members[f"{contract_id}/{long_prefix}{copy}.pdf"] = make_pdf([["scan"]])
+
+    # E-mails and office files
+    members[f"{contract_id}/RE approval of renewal.msg"] = msg_file(rnd)
+    members[f"{contract_id}/pricing.xlsx"] = office_file()
+    members[f"{contract_id}/notes.docx"] = office_file()
+    members[f"{contract_id}/readme.txt"] = b"generated by benchmark.py"
+
+    # Nested ZIP with more documents
+    nested = io.BytesIO()
+    with zipfile.ZipFile(nested, "w", zipfile.ZIP_DEFLATED) as inner:
+        inner.writestr("attachments/CDA signed.pdf", make_pdf([["CONFIDENTIAL DISCLOSURE AGREEMENT"]]))
+        inner.writestr("attachments/Certificate of completion.pdf", make_pdf([["certificate"]]))
+        inner.writestr("attachments/invoice.xls", office_file())
+    members[f"{contract_id}/attachments.zip"] = nested.getvalue()
+
+    return members
+
+def build_corpus(source_path: str, contracts: int, seed: int = 0, max_pages: int = 20) -> dict:
+    """
+    Write `contracts` contract ZIPs directly into `source_path`. Returns
+    corpus statistics.
+    """
+    rnd = random.Random(seed)
+    stats = {"contracts": contracts, "archives_bytes": 0, "members": 0}
+    os.makedirs(source_path, exist_ok=True)
+
+    for index in range(contracts):
+        contract_id = f"CW{100000 + index}"
+        members = contract_members(rnd, contract_id, max_pages)
+        zip_path = os.path.join(source_path, f"{contract_id}.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, payload in members.items():
+                archive.writestr(name, payload)
+        stats["archives_bytes"] += os.path.getsize(zip_path)
+        stats["members"] += len(members)
+
+    return stats
+
+
+# ================================================================================
+# Timing
+# ================================================================================
+
+def timed(func, *args, **kwargs):
+    """Run func and return (result, wall seconds, CPU seconds of this process)."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - wall, time.process_time() - cpu
+
+def run_size(work_dir: str, contracts: int, seed: int, max_pages: int, workers: int) -> dict:
+    """Build one corpus and time each step on it."""
+    source_path = os.path.join(work_dir, f"source_{contracts}")
+    dest_path   = os.path.join(work_dir, f"dest_{contracts}")
+    shutil.rmtree(source_path, ignore_errors=True)
+    shutil.rmtree(dest_path, ignore_errors=True)
+    os.makedirs(dest_path)
+
+    corpus, build_s, _ = timed(build_corpus, source_path, contracts, seed, max_pages)
+    fn.take_metrics()   # Discard anything left over from the previous size
+    result = {**corpus, "corpus_build_s": round(build_s, 3)}
+
+    zip_summary, wall, cpu = timed(fn.step_1, source_path, dest_path)
+    result["step_1"] = {"wall_s": round(wall, 3), "cpu_s": round(cpu, 3),
+                        "workspaces": len(zip_summary), "files": sum(zip_summary.values())}
+
+    results, wall, cpu = timed(fn.run_step_2, dest_path, zip_summary, max_workers=workers)
+    result["step_2"] = {"wall_s": round(wall, 3), "cpu_s": round(cpu, 3),
+                        "rows": sum(len(file_resume) for file_resume, _ in results.values())}
+    fn.finish_catalog_run(dest_path)
+
+    _, wall, cpu = timed(fn.step_3, dest_path)
+    result["step_3"] = {"wall_s": round(wall, 3), "cpu_s": round(cpu, 3)}
+
+    result["total_wall_s"] = round(sum(result[step]["wall_s"] for step in ("step_1", "step_2", "step_3")), 3)
+    result["files_per_s"] = round(result["step_1"]["files"] / result["total_wall_s"], 2) if result["total_wall_s"] else None
+
+    metrics = fn.take_metrics()   # Sub-step timings and counters, worker metrics included
+    result["stages"] = {name: {key: round(value, 3) for key, value in stage.items()}
+                        for name, stage in sorted(metrics["stages"].items())}
+    result["counters"] = metrics["counters"]
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the File Organizer pipeline on a synthetic corpus.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200],
+                        help="number of contract ZIPs per run (default: 10 50 200)")
+    parser.add_argument("--seed", type=int, default=0, help="corpus generator seed")
+    parser.add_argument("--max-pages", type=int, default=20, help="maximum filler pages per agreement")
+    parser.add_argument("--workers", type=int, default=dt.max_workers, help="Step 2 worker processes")
+    parser.add_argument("--extract-workers", type=int, default=dt.extract_workers, help="Step 1 extraction threads")
+    parser.add_argument("--cache", action="store_true", help="keep the PDF text cache enabled (cold runs by default)")
+    parser.add_argument("--work-dir", default=None, help="scratch folder (default: a temporary folder)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated corpus and outputs")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline log")
+    args = parser.parse_args()
+
+    fn.setup_log()
+    logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+    dt.text_cache_enabled = args.cache
+    dt.extract_workers = args.extract_workers
+    dt.incremental_runs = False
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="file_organizer_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "seed": args.seed,
+            "max_pages": args.max_pages,
+            "workers": args.workers,
+            "extract_workers": args.extract_workers,
+            "text_cache": args.cache,
+            "classification_mode": dt.classification_mode,
+        },
+        "results": [],
+    }
+
+    try:
+        for contracts in args.sizes:
+            result = run_size(work_dir, contracts, args.seed, args.max_pages, args.workers)
+            report["results"].append(result)
+            print(f"{contracts:>6} contracts | step_1 {result['step_1']['wall_s']:>8.2f}s | "
+                  f"step_2 {result['step_2']['wall_s']:>8.2f}s | step_3 {result['step_3']['wall_s']:>8.2f}s | "
+                  f"{result['files_per_s']} files/s")
+    finally:
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
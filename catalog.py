@@ -0,0 +1,175 @@
+"""
+Queries over the file catalog written by the pipeline (dt.catalog_enabled).
+
+The catalog is a SQLite file under the destination folder with one row per
+classified file (contract id, category folder, file category, amendment
+number, date, extension, final path relative to the destination folder,
+content hash, duplicate of, run id), one row per contract workspace and one
+row per run. Questions are answered from its indexes, without re-reading or
+merging the per-workspace CSVs, and the global CSVs can be exported from it.
+
+Usage:
+    python catalog.py <dest folder> files --contract CW1000 --category LIA
+    python catalog.py <dest folder> missing --document BSA
+    python catalog.py <dest folder> duplicates
+    python catalog.py <dest folder> runs
+    python catalog.py <dest folder> export --output-folder <folder>
+"""
+import os # This module provides functions for interacting with the operating system
+import sys # This module provides the exit code of the command
+import csv # This module writes the exported CSVs
+import json # This module provides an easy way to encode and decode data in JSON format
+import time # This module provides the clock used to time each query
+import sqlite3 # This module provides a SQL interface to SQLite databases
+import pathlib # This module builds the read-only URI of the catalog file
+import argparse # This module parses the command line options
+import data as dt # This module contains the catalog name and the required documents
+import functions as fn # This module contains the catalog schema and the resume CSV columns
+
+
+def open_catalog(path: str) -> sqlite3.Connection:
+    """
+    Open the catalog at `path`, a catalog file or the destination folder
+    holding it, read-only. A catalog written with another schema version is
+    refused (sqlite3.DatabaseError) rather than changed.
+    """
+    catalog_path = os.path.join(path, dt.catalog_name) if os.path.isdir(path) else path
+    if not os.path.exists(catalog_path):
+        raise FileNotFoundError(f"No file catalog at {catalog_path}")
+    conn = sqlite3.connect(pathlib.Path(catalog_path).absolute().as_uri() + "?mode=ro", uri=True)
+    try:
+        fn.check_catalog_version(conn, catalog_path)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+def fetch(conn: sqlite3.Connection, sql: str, params=()) -> list:
+    """Rows of `sql` as dicts keyed by column name."""
+    cursor = conn.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def find_files(conn: sqlite3.Connection, contract: str = None, file_category: str = None,
+               category_folder: str = None, content_hash: str = None, run_id: int = None) -> list:
+    """
+    Files matching every filter given (file categories compare
+    case-insensitively), in the order they were recorded.
+    """
+    filters = {"contract_id": contract, "file_category": file_category, "category_folder": category_folder,
+               "content_hash": content_hash, "run_id": run_id}
+    filters = {column: value for column, value in filters.items() if value is not None}
+    where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+    return fetch(conn, f"SELECT * FROM files WHERE {where} ORDER BY rowid", tuple(filters.values()))
+
+def missing_documents(conn: sqlite3.Connection, document: str = "BSA") -> list:
+    """Contracts without any file whose category satisfies `document` (see fn.REQUIRED_DOCUMENTS)."""
+    aliases = sorted(fn.REQUIRED_DOCUMENTS.get(document, {document}))
+    return fetch(conn, f"""
+        SELECT contract_id, files, comments FROM contracts AS c
+        WHERE NOT EXISTS (SELECT 1 FROM files AS f
+                          WHERE f.contract_id = c.contract_id
+                            AND f.file_category IN ({', '.join('?' * len(aliases))}))
+        ORDER BY contract_id
+    """, aliases)
+
+def duplicate_files(conn: sqlite3.Connection) -> list:
+    """Files whose content was already seen elsewhere, with the first copy they duplicate."""
+    return fetch(conn, "SELECT contract_id, final_path, duplicate_of, content_hash FROM files "
+                       "WHERE duplicate_of != '' ORDER BY content_hash, rowid")
+
+def list_runs(conn: sqlite3.Connection) -> list:
+    return fetch(conn, "SELECT * FROM runs ORDER BY run_id")
+
+def export_csvs(conn: sqlite3.Connection, folder: str) -> tuple:
+    """
+    Write File_Resume.csv and Contract_Resume.csv into `folder` from the
+    catalog, with the columns of the CSVs Step 3 merges. Returns the
+    number of (file, contract) rows written.
+    """
+    file_rows = contract_rows = 0
+    with open(os.path.join(folder, "File_Resume.csv"), "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh, lineterminator=os.linesep)
+        writer.writerow(fn.FILE_RESUME_COLUMNS)
+        for row in conn.execute(
+            "SELECT category_folder, contract_id, supplier_name, file_category, amendment_number, "
+            "extracted_date, file_extension, file_name, content_hash, duplicate_of FROM files ORDER BY rowid"
+        ):
+            writer.writerow(row)
+            file_rows += 1
+
+    with open(os.path.join(folder, "Contract_Resume.csv"), "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh, lineterminator=os.linesep)
+        writer.writerow(fn.CONTRACT_RESUME_COLUMNS)
+        for row in conn.execute("SELECT contract_id, comments FROM contracts WHERE comments != '' ORDER BY contract_id"):
+            writer.writerow(row)
+            contract_rows += 1
+    return file_rows, contract_rows
+
+def print_rows(rows: list, columns: tuple, as_json: bool):
+    if as_json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return
+    widths = [max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the file catalog of a destination folder.")
+    parser.add_argument("catalog", help="destination folder (or the catalog file itself)")
+    parser.add_argument("--json", action="store_true", help="print the rows as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    files = commands.add_parser("files", help="list classified files")
+    files.add_argument("--contract", help="contract id (workspace name)")
+    files.add_argument("--category", help="file category, e.g. LIA or MSA")
+    files.add_argument("--folder", help="category folder, e.g. 'Base Service Agreement'")
+    files.add_argument("--hash", help="SHA-256 content hash")
+    files.add_argument("--run", type=int, help="run id that recorded the files")
+
+    missing = commands.add_parser("missing", help="contracts missing a required document")
+    missing.add_argument("--document", default="BSA",
+                         help=f"one of {', '.join(fn.REQUIRED_DOCUMENTS)} or a file category (default: BSA)")
+
+    commands.add_parser("duplicates", help="files whose content already appeared in the run")
+    commands.add_parser("runs", help="runs recorded in the catalog")
+
+    export = commands.add_parser("export", help="write File_Resume.csv / Contract_Resume.csv from the catalog")
+    export.add_argument("--output-folder", help="folder for the CSVs (default: the catalog's folder)")
+    args = parser.parse_args()
+
+    try:
+        conn = open_catalog(args.catalog)
+    except (OSError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    if args.command == "export":
+        folder = args.output_folder or (args.catalog if os.path.isdir(args.catalog) else os.path.dirname(args.catalog))
+        file_rows, contract_rows = export_csvs(conn, folder)
+        print(f"Exported {file_rows} file rows and {contract_rows} contract rows to {folder}")
+        return 0
+
+    if args.command == "files":
+        rows = find_files(conn, args.contract, args.category, args.folder, args.hash, args.run)
+        columns = ("contract_id", "file_category", "amendment_number", "extracted_date", "final_path")
+    elif args.command == "missing":
+        rows = missing_documents(conn, args.document)
+        columns = ("contract_id", "files", "comments")
+    elif args.command == "duplicates":
+        rows = duplicate_files(conn)
+        columns = ("contract_id", "final_path", "duplicate_of")
+    else:
+        rows = list_runs(conn)
+        columns = ("run_id", "started", "finished", "rules_version", "workspaces", "files")
+    elapsed = time.perf_counter() - started
+
+    print_rows(rows, columns, args.json)
+    print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Classification parity check between PDF text backends.
+
+Classifies every PDF found under a folder (loose PDFs and PDFs inside ZIP
+archives, nested ZIPs included) with each backend in functions.PDF_BACKENDS
+and compares category, file category, date and amendment number/country
+against the first backend (the reference, pdfplumber by default). Files
+are never moved and the text cache is not used.
+
+Usage:
+    python compare_backends.py <folder> --backends pdfplumber pdfminer-raw --output parity.json
+"""
+import os # This module provides functions for interacting with the operating system
+import sys # This module provides the exit code of the check
+import json # This module provides an easy way to encode and decode data in JSON format
+import time # This module provides the clock used to time each backend
+import shutil # This module provides a higher-level interface for file operations, such as removing folders
+import logging # This module provides a flexible framework for emitting log messages from Python programs
+import argparse # This module parses the command line options
+import tempfile # This module provides the scratch folder ZIP archives are extracted to
+import functions as fn # This module contains the PDF backends and the classifier being compared
+
+FIELDS = ("category", "subcategory", "date", "amendment_number")
+
+
+def collect_pdfs(folder: str, scratch: str) -> list:
+    """
+    Return (label, path) for every PDF under `folder`. ZIP archives are
+    extracted into `scratch` first (unless it is None); their PDFs are
+    labelled archive/member.
+    """
+    pdfs = []
+    for file_path in walk_files(folder):
+        label = os.path.relpath(file_path, folder)
+        if file_path.lower().endswith(".pdf"):
+            pdfs.append((label, file_path))
+        elif file_path.lower().endswith(".zip") and scratch is not None:
+            # extract_zip_files unpacks nested ZIPs too
+            extract_to = os.path.join(scratch, str(len(os.listdir(scratch))))
+            os.makedirs(extract_to)
+            if fn.extract_zip_files(file_path, extract_to) == -1:
+                continue
+            pdfs.extend((os.path.join(label, inner_label), inner_path)
+                        for inner_label, inner_path in collect_pdfs(extract_to, scratch=None))
+    return pdfs
+
+def walk_files(folder: str):
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file in sorted(files):
+            yield os.path.join(root, file)
+
+def classify_all(pdfs: list, backend: str) -> tuple:
+    """Classify every PDF with `backend`. Returns ({label: result}, seconds, pages)."""
+    fn.take_metrics()
+    results = {}
+    started = time.perf_counter()
+    for label, file_path in pdfs:
+        try:
+            info = fn.classify_pdf_file(file_path, cache_path=None, backend=backend)
+            results[label] = {field: info[field] for field in FIELDS} if info else None
+        except Exception as e:
+            results[label] = {"error": str(e)}
+    seconds = time.perf_counter() - started
+    return results, seconds, fn.take_metrics()["counters"].get("pdf_pages", 0)
+
+def compare(reference: dict, candidate: dict) -> tuple:
+    """Return ({field: matching files}, [mismatch rows]) of `candidate` against `reference`."""
+    matches = {field: 0 for field in FIELDS}
+    mismatches = []
+    for label, expected in reference.items():
+        actual = candidate[label]
+        if expected == actual:
+            for field in FIELDS:
+                matches[field] += 1
+            continue
+        expected_fields = expected if expected and "error" not in expected else {}
+        actual_fields   = actual if actual and "error" not in actual else {}
+        for field in FIELDS:
+            if expected_fields.get(field) == actual_fields.get(field):
+                matches[field] += 1
+        mismatches.append({"file": label, "expected": expected, "actual": actual})
+    return matches, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF classification across text backends.")
+    parser.add_argument("folder", help="folder with PDFs and/or ZIP archives")
+    parser.add_argument("--backends", nargs="+", default=list(fn.PDF_BACKENDS),
+                        help="backends to compare; the first one is the reference")
+    parser.add_argument("--output", default="backend_parity.json", help="JSON report file")
+    parser.add_argument("--fail-under", type=float, default=None,
+                        help="exit with status 1 when a backend's file parity (percent) is lower")
+    args = parser.parse_args()
+
+    fn.setup_log()
+    logging.getLogger().setLevel(logging.WARNING)
+    for backend in args.backends:
+        fn.get_pdf_backend(backend)
+
+    scratch = tempfile.mkdtemp(prefix="compare_backends_")
+    try:
+        pdfs = collect_pdfs(args.folder, scratch)
+        if not pdfs:
+            print(f"No PDFs found under {args.folder}")
+            return 1
+
+        reference_name = args.backends[0]
+        reference, seconds, pages = classify_all(pdfs, reference_name)
+        report = {"folder": os.path.abspath(args.folder), "pdfs": len(pdfs), "reference": reference_name,
+                  "backends": {reference_name: {"seconds": round(seconds, 3), "pages": pages}}}
+        print(f"{reference_name:>14}: {seconds:8.2f}s (reference, {len(pdfs)} PDFs, {pages} pages)")
+
+        status = 0
+        for backend in args.backends[1:]:
+            candidate, seconds, pages = classify_all(pdfs, backend)
+            matches, mismatches = compare(reference, candidate)
+            parity = 100.0 * (len(pdfs) - len(mismatches)) / len(pdfs)
+            report["backends"][backend] = {
+                "seconds"       : round(seconds, 3),
+                "pages"         : pages,
+                "speedup"       : round(report["backends"][reference_name]["seconds"] / seconds, 2) if seconds else None,
+                "file_parity"   : round(parity, 2),
+                "field_parity"  : {field: round(100.0 * hits / len(pdfs), 2) for field, hits in matches.items()},
+                "mismatches"    : mismatches,
+            }
+            print(f"{backend:>14}: {seconds:8.2f}s | parity {parity:6.2f}% | {len(mismatches)} mismatches")
+            if args.fail_under is not None and parity < args.fail_under:
+                status = 1
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+    print(f"Report written to {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,119 @@ source_path = r'C:\Example\Source\Folder'
 output_path = r'C:\Example\Outputh\Folder'
 dest_path   = r'C:\Example\Destination\Folder'
 
+# Performance Settings
+# classification_mode "full" reads PDF text first and falls back to filename rules. "filename" only applies
+# the filename rules and never imports pdfplumber, which is much faster for small ad-hoc drops.
+
+classification_mode = "full"
+
+# pdf_backend is the library used to read PDF text in "full" mode. "pdfplumber" runs the full layout
+# analysis; "pdfminer-raw" reads characters in content-stream order without layout analysis, which is
+# many times faster and enough for keyword and anchor matching. Check parity on your own documents with
+# compare_backends.py before switching.
+
+pdf_backend = "pdfplumber"
+
+# PDFs are read one page at a time. pdf_page_budget caps the pages read per PDF (None = all pages).
+# With pdf_early_stop, reading stops as soon as a category has matched and the first-listed date, trailing
+# number or country anchor it defines has matched (a date found elsewhere or a lower-priority anchor does
+# not stop the read), so long agreements with exhibits only pay for their first pages. The first category matched on the pages read so far wins, which can differ from a full read
+# when a later page mentions an earlier category of folder_categories; off by default for that reason.
+
+pdf_page_budget = None
+pdf_early_stop  = False
+
+# PDFs with more than pdf_split_pages pages (None = never split) are read by pdf_split_workers processes
+# (None = one per CPU core) that each open the file on their own and extract pdf_split_chunk pages at a
+# time; the pages are put back in order before classification. Inside Step 2 workers this multiplies
+# the number of processes, so keep the threshold for the few really large agreements.
+
+pdf_split_pages   = None
+pdf_split_workers = None
+pdf_split_chunk   = 25
+
+# max_workers is the number of worker processes used to classify contract workspaces in Step 2.
+# None uses one worker per CPU core, 1 keeps the serial behaviour (useful for debugging).
+
+max_workers = None
+
+# extract_workers is the number of ZIP archives extracted at the same time in Step 1 (1 = serial).
+# Decompression and file writes release the GIL, so threads are enough to overlap archives.
+
+extract_workers = 4
+
+# With incremental_runs, a manifest of processed archives (path, size, mtime, content hash, rules version,
+# output rows) is kept under dest_path. Unchanged archives are skipped, changed ones are re-extracted from
+# scratch, and Step 3 only re-merges the workspaces processed in this run.
+
+incremental_runs = True
+manifest_name    = "processed_archives.json"
+
+# With pipelined, each workspace is classified as soon as its ZIP is extracted instead of waiting for the
+# whole of Step 1. pipeline_queue_size bounds how many extracted workspaces may wait for classification
+# (None = one per classification worker); extraction pauses while the queue is full.
+
+pipelined           = True
+pipeline_queue_size = None
+
+# Extracted PDF text is cached in a SQLite file under dest_path, keyed by the content hash of each PDF,
+# so re-runs over an unchanged corpus skip pdfplumber. The least recently used entries are evicted
+# once the cache grows beyond text_cache_max_mb.
+
+text_cache_enabled = True
+text_cache_name    = "pdf_text_cache.sqlite"
+text_cache_max_mb  = 2048
+
+# Every extracted file is hashed (SHA-256) while it is written. Copies of the same content within a run
+# are parsed once and reported in the "Content Hash" and "Duplicate Of" columns of the resume CSVs. With
+# dedupe_hardlinks, a copy whose content was already extracted in the run is stored as a hardlink to the
+# first copy instead of being written again; the copies then share one file on disk, so an edit to one
+# of them shows in all.
+
+dedupe_hardlinks = False
+
+# Step 3 streams the per-workspace CSVs into File_Resume.csv and Contract_Resume.csv. With summary_parquet,
+# it also writes File_Resume.parquet and Contract_Resume.parquet under dest_path: Parquet datasets with
+# one partition per contract, for analytics tools. This needs pyarrow (pip install pyarrow); without it, Step 3
+# logs a warning and writes the CSVs only.
+
+summary_parquet = False
+
+# With dry_run, nothing is extracted or moved: every ZIP under source_path is listed from its central
+# directory, its members are classified as Step 2 would (PDF content in "full" mode, each PDF copied to a
+# temp folder and deleted right after; filename rules otherwise) and the planned category folder and final
+# path of every file are written to dry_run_report under dest_path. With classification_mode = "filename",
+# only the listings are read, so even a very large drop is previewed in seconds.
+
+dry_run        = False
+dry_run_report = "placement_plan.csv"
+
+# With catalog_enabled, every classified file (category folder, contract id, file category, amendment number,
+# date, extension, final path, content hash) is written to a SQLite catalog under dest_path as soon as its
+# workspace is classified, together with the id of the run that wrote it. Query it, or export the global
+# CSVs from it, with catalog.py (python catalog.py <dest_path> --help). A catalog written with another schema
+# version is never dropped: the run logs a warning and leaves it untouched, and catalog.py refuses to read it.
+
+catalog_enabled = True
+catalog_name    = "file_catalog.sqlite"
+
+# With metrics_enabled, wall/CPU time per stage and sub-step, file/byte/page counters and the
+# metrics_slowest_pdfs slowest PDFs (with their page counts) are written to metrics_name under dest_path
+# at the end of the run. profile_enabled also records a cProfile of the run (and of every Step 2 worker
+# task) into profile_folder under dest_path; open the .pstats files with pstats or snakeviz.
+
+metrics_enabled      = True
+metrics_name         = "run_metrics.json"
+metrics_slowest_pdfs = 20
+profile_enabled      = False
+profile_folder       = "_profiles"
+
 # Folder Category
 # This is the dictionary that contains the folder categories and their respective keywords, extensions, and other attributes.
 # The keys are the folder names, and the values are dictionaries that contain the keywords, extensions, and other attributes for each folder.
 # The keywords are used to identify the files that belong to that folder, and the extensions are used to filter the files based on their file type.
+# An extension can be a single string or a list; keywords ["any"] match every file with one of the extensions. Subcategories are
+# tried in the order they are listed, and the first one that matches wins.
 
 folder_categories = {
     "Contract Amendments": { # This is the folder for Contract Amendments and related documents.
@@ -120,7 +229,7 @@ folder_categories = {
             "keywords": ["cda", "confidential disclosure agreement", "confidentiality agreement", "nda", "non-disclosure agreement"],
             "extension": "pdf"
         },
-        "Supporting document": { # This is the file configuration for general supporting documents and related files.
+        "Supporting Document": { # This is the file configuration for general supporting documents and related files.
             "keywords": ["any"],
             "extension": ["pdf","msg"]
         }
@@ -1,21 +1,43 @@
 import os # This module provides functions for interacting with the operating system
 import re # This module provides regular expression matching operations similar to those found in Perl
 import glob # This module finds all the pathnames matching a specified pattern according to the rules used by the Unix shell
+import csv # This module reads and writes CSV files, used to stream the Step 3 merge
 import json # This module provides an easy way to encode and decode data in JSON format
+import time # This module provides time access, used to track when cache entries were last read
 import shutil # This module provides a higher-level interface for file operations, such as copying and moving files
+import sqlite3 # This module provides a SQL interface to SQLite databases, used for the PDF text cache and the file catalog
+import hashlib # This module provides secure hashes, used to key cached PDF text by file content
+import heapq # This module provides a heap queue, used to keep the slowest PDFs of a run
+import io # This module provides in-memory binary buffers, used to hold small nested ZIPs
+import tempfile # This module provides temporary files, used to spool nested ZIPs without writing them to the destination
 import zipfile # This module provides tools to create, read, write, append, and list a ZIP file
+import functools # This module provides higher-order functions, used to memoize compiled regexes and parsed dates
+import itertools # This module provides iterator building blocks, used to skip pages already read
+import importlib # This module imports modules by name, used to read the version of the selected PDF backend
 import logging # This module provides a flexible framework for emitting log messages from Python programs
-import colorlog # This module provides a way to add color to log messages in the console output
 import traceback # This module provides a standard interface to extract, format, and print stack traces of Python programs
-import pdfplumber # This module is used to extract text and metadata from PDF files
+import cProfile # This module provides a deterministic profiler, used by the opt-in profiling hook
+import contextlib # This module provides utilities for with-statement contexts, used to time pipeline stages
 import data as dt # This module contains data structures and constants used in the script
-import pandas as pd # This module provides data structures and data analysis tools, particularly for working with tabular data     
 from datetime import datetime # This module provides classes for manipulating dates and times
+import queue # This module provides synchronized queues, used to hand extracted workspaces to Step 2
+import collections # This module provides specialized containers, used to keep split page ranges in order
+import threading # This module provides threads, used to run extraction alongside classification
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED # This module runs callables in pools of worker processes or threads
+
+# Heavy dependencies are imported inside the functions that need them, so importing this
+# module (or a filename-only run) does not pay for loading the whole stack:
+#   colorlog   → setup_log                               (colored console output)
+#   pdfplumber → iter_pages_pdfplumber                    (PDF text extraction, default backend)
+#   pdfminer   → iter_pages_pdfminer_raw                  (PDF text extraction, raw backend)
+#   pandas     → step_2 / step_3                         (CSV summaries)
 
 # === Helping Functions ===
 
 # Function that sets the log configuration
 def setup_log():
+    import colorlog # This module provides a way to add color to log messages in the console output
+
     formatter = colorlog.ColoredFormatter(
         '%(asctime)s - %(log_color)s%(levelname)-8s%(reset)s - %(message)s',  # Format with colors
         datefmt='%Y-%m-%d %H:%M:%S',
@@ -41,6 +63,24 @@ def setup_log():
     logger = logging.getLogger()
     return logger
 
+# Initializer of every worker process pool
+def init_worker(settings: dict, log_level: int = logging.DEBUG):
+    """
+    Apply the settings and log level of the parent process (see
+    worker_initargs), then set up logging. Under the spawn start method
+    (Windows, macOS) workers re-import data.py, so settings changed at
+    runtime, as benchmark.py does, would otherwise revert to their defaults.
+    """
+    vars(dt).update(settings)
+    setup_log()
+    logging.getLogger().setLevel(log_level)
+
+def worker_initargs() -> tuple:
+    """initargs of init_worker: the data.py settings and the log level of this process."""
+    settings = {name: value for name, value in vars(dt).items()
+                if not name.startswith("_") and isinstance(value, (str, int, float, bool, list, tuple, dict, type(None)))}
+    return settings, logging.getLogger().level
+
 # Function to trim the filename to a maximum length
 def trim_filename(filename: str, max_len: int = 85) -> str:
     """
@@ -70,6 +110,63 @@ def trim_filename(filename: str, max_len: int = 85) -> str:
 # ================================================================================
 
  
+# ---------------- Country alias index ---------------------------
+# Built once at import from dt.countries:
+#   COUNTRY_ALIASES : upper-case alias → canonical name (O(1) lookups)
+#   COUNTRY_TRIE    : token trie of country names (not ISO codes) used to
+#                     find a name at the start of free text, e.g.
+#                     "Korea, Republic of" or "United Kingdom This Agreement…"
+
+def country_tokens(text: str) -> list:
+    """Split text into upper-case word tokens, ignoring punctuation."""
+    return re.findall(r"[^\W_]+(?:'[^\W_]+)*", text.upper())
+
+def build_country_index(countries: dict) -> tuple:
+    """Return (COUNTRY_ALIASES, COUNTRY_TRIE) for the `countries` mapping."""
+    aliases, trie = {}, {}
+    for canon_name, names in countries.items():
+        for alias in sorted(names):
+            aliases.setdefault(alias.strip().upper(), canon_name)
+
+            tokens = country_tokens(alias)
+            is_name = len(tokens) > 1 or (len(alias) > 3 and not alias.isupper())
+            if not tokens or not is_name:
+                continue
+            node = trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(None, canon_name)   # None marks the end of a name
+    return aliases, trie
+
+COUNTRY_ALIASES, COUNTRY_TRIE = build_country_index(dt.countries)
+
+def canonical_country(token: str) -> str:
+    """Alias → canonical country name, or "" when `token` is not an alias."""
+    return COUNTRY_ALIASES.get(token.strip().upper(), "")
+
+def match_country_tokens(tokens: list, start: int = 0) -> tuple:
+    """
+    Walk COUNTRY_TRIE from tokens[start] and return (canonical name,
+    number of tokens) for the longest country name found, or ("", 0).
+    """
+    node, found = COUNTRY_TRIE, ("", 0)
+    for i in range(start, len(tokens)):
+        node = node.get(tokens[i])
+        if node is None:
+            break
+        if None in node:
+            found = (node[None], i - start + 1)
+    return found
+
+COUNTRY_LOOKAHEAD = 120   # Characters after an LIA anchor searched for a multi-word country name
+
+@functools.lru_cache(maxsize=None)
+def compile_country_anchors(patterns: tuple) -> list:
+    """Compile one regex per LIA anchor, capturing the words that follow it."""
+    country_regex = r"([A-Za-z]{2,}(?:\s+[A-Za-z]{2,})*)"
+    return [re.compile(rf"{re.escape(anchor)}\s*[:\-–]?\s*{country_regex}", re.IGNORECASE)
+            for anchor in patterns]
+
 def extract_lia_country(text: str, patterns: list, filename: str = "") -> str:
     """
     1) Try to capture the country right after any anchor in `patterns`
@@ -78,123 +175,1279 @@ def extract_lia_country(text: str, patterns: list, filename: str = "") -> str:
     Returns canonical country name or "".
     """
 
-    # ---------------- helper: alias → canonical ------------------
-    def canon(token: str) -> str:
-        tok_upper = token.strip().upper()
-        for canon_name, aliases in dt.countries.items():
-            if tok_upper in (alias.upper() for alias in aliases):
-                return canon_name
-        return ""
-
     # ---------------- (1) PDF text lookup -----------------------
-    country_regex = r"([A-Za-z]{2,}(?:\s+[A-Za-z]{2,})*)"
-    for anchor in patterns:
-        rx = rf"{re.escape(anchor)}\s*[:\-–]?\s*{country_regex}"
-        m = re.search(rx, text, flags=re.IGNORECASE)
-        if m:
-            raw = re.sub(r"[.,;:\s]+$", "", m.group(1).strip())
-            if (c := canon(raw)):
-                return c
+    for rx in compile_country_anchors(tuple(patterns)):
+        m = rx.search(text)
+        if m and (c := country_after_anchor(m, text)):
+            return c
 
     # ---------------- (2) filename fallback ---------------------
     base = os.path.splitext(filename)[0]
     for token in re.split(r"[ _\-]", base)[::-1]:          # de atrás hacia delante
-        if (c := canon(token)):
+        if (c := canonical_country(token)):
             return c
     # ejemplo final “..._United_Kingdom”
     tail = re.search(r"([A-Z][a-z]+(?:[_\-\s][A-Z][a-z]+)*)$", base)
-    if tail and (c := canon(tail.group(1).replace("_", " ").replace("-", " "))):
+    if tail and (c := canonical_country(tail.group(1).replace("_", " ").replace("-", " "))):
         return c
+    # multi-word names anywhere in the name, e.g. “Scan_United_Kingdom_lia”
+    tokens = country_tokens(base.replace("_", " "))
+    for start in range(len(tokens) - 1, -1, -1):
+        c, _ = match_country_tokens(tokens, start)
+        if c:
+            return c
 
     return ""
 
+def country_after_anchor(m: re.Match, text: str) -> str:
+    """Canonical country captured by a compile_country_anchors match in `text`, or ""."""
+    raw = re.sub(r"[.,;:\s]+$", "", m.group(1).strip())
+    if (c := canonical_country(raw)):
+        return c
+    # Country name followed by more words on the same run of text
+    c, _ = match_country_tokens(country_tokens(text[m.start(1):m.start(1) + COUNTRY_LOOKAHEAD]))
+    return c
+
+@functools.lru_cache(maxsize=None)
+def compile_trailing_number(pattern: str) -> re.Pattern:
+    """Regex capturing the token that follows a trailing-number anchor."""
+    return re.compile(re.escape(pattern) + r"\s*(\S+)", re.IGNORECASE)
+
 def extract_trailing_number(text: str, trailing_patterns:list)-> str:
     for pattern in trailing_patterns:
-        match = re.search(re.escape(pattern) + r"\s*(\S+)", text, re.IGNORECASE)
+        match = compile_trailing_number(pattern).search(text)
         if match:
             return match.group(1).strip()
     return ""
 
+# ---------------- Date extraction engine ------------------------
+# Every accepted date shape is a named branch of one union pattern. The
+# branch that matched decides which strptime formats can parse it, in the
+# same order the formats used to be tried one after the other.
+_MONTHS      = r"(?:January|February|March|April|May|June|July|August|" \
+               r"September|October|November|December)"
+_MONTHS_ABBR = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*"
+
+DATE_BRANCHES = (
+    # (branch name, regex, strptime formats that can parse it)
+    ("month_name", rf"{_MONTHS}\s+\d{{1,2}},\s+\d{{4}}",                  ("%B %d, %Y",)),             # January 5, 2024
+    ("ordinal_dm", rf"\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTHS}\s+\d{{4}}",    ("%d %B %Y",)),              # 5th January 2024
+    ("abbr_mdy",   rf"{_MONTHS_ABBR}\s+\d{{1,2}},?\s+\d{{4}}",             ("%B %d, %Y", "%b %d, %Y")), # Jan 5, 2024
+    ("abbr_dmy",   rf"\d{{1,2}}\s+{_MONTHS_ABBR}\s+\d{{4}}",               ("%d %B %Y", "%d %b %Y")),   # 5 Jan 2024
+    ("numeric",    r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}",                        ("%m/%d/%Y", "%m/%d/%y",     # 05/01/2024
+                                                                              "%d-%m-%Y", "%d-%m-%y")),    # 5-1-2024
+    ("iso",        r"\d{4}-\d{2}-\d{2}",                                    ("%Y-%m-%d",)),              # 2024-01-05
+    ("dots_eu",    r"\d{1,2}\.\d{1,2}\.\d{2,4}",                          ("%d.%m.%Y", "%d.%m.%y")),   # 5.1.2024
+)
+DATE_FORMATS = {name: formats for name, _, formats in DATE_BRANCHES}
+DATE_UNION   = "(?:" + "|".join(f"(?P<{name}>{rx})" for name, rx, _ in DATE_BRANCHES) + ")"
+DATE_REGEX   = re.compile(DATE_UNION, re.IGNORECASE)
+
+@functools.lru_cache(maxsize=None)
+def compile_date_anchors(date_patterns: tuple):
+    """
+    Compile the anchors of one subcategory into a single regex.
+
+    One anchor is a plain search. Several anchors are merged into one
+    alternation inside a lookahead, so a single scan reports, at every
+    position, the highest-priority anchor followed by a date.
+    """
+    if not date_patterns:
+        return None
+    if len(date_patterns) == 1:
+        return re.compile(rf"{re.escape(date_patterns[0])}\s*[:\-]?\s*{DATE_UNION}", re.IGNORECASE)
+
+    anchors = "|".join(f"(?P<anchor{i}>{re.escape(anchor)})" for i, anchor in enumerate(date_patterns))
+    return re.compile(rf"(?=(?:{anchors})\s*[:\-]?\s*{DATE_UNION})", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=4096)
+def normalize_date(raw_date: str, branch: str) -> str:
+    """Parse a date matched by `branch` of DATE_UNION and return it as MM/DD/YYYY, or ""."""
+    raw_date = re.sub(r"(\d{1,2})(st|nd|rd|th)", r"\1", raw_date.strip(), flags=re.I)
+
+    formats = DATE_FORMATS[branch]
+    if branch == "numeric":
+        formats = formats[:2] if "/" in raw_date else formats[2:]
+
+    for fmt in formats:
+        try:
+            return datetime.strptime(raw_date, fmt).strftime("%m/%d/%Y")
+        except ValueError:
+            continue
+    return ""
+
+def search_date(text: str, date_patterns) -> tuple:
+    """
+    Return (raw_date, branch) for the first date after the earliest listed
+    anchor found in `text`, falling back to the first date anywhere.
+    Returns ("", "") when nothing is found.
+    """
+    anchor_regex = compile_date_anchors(tuple(date_patterns))
+
+    if anchor_regex is not None and len(date_patterns) == 1:
+        m = anchor_regex.search(text)
+        if m:
+            return m.group(m.lastgroup), m.lastgroup
+
+    elif anchor_regex is not None:
+        best = None
+        for m in anchor_regex.finditer(text):
+            priority = next(i for i in range(len(date_patterns)) if m.group(f"anchor{i}") is not None)
+            if best is None or priority < best[0]:
+                best = (priority, m.group(m.lastgroup), m.lastgroup)
+                if priority == 0:
+                    break
+        if best:
+            return best[1], best[2]
+
+    m = DATE_REGEX.search(text)
+    if m:
+        return m.group(0), m.lastgroup
+    return "", ""
+
 def extract_date(text: str, date_patterns: list) -> str:
     """
     Search for the first date after any anchor in `date_patterns` (or
     anywhere in the text) and return it normalized as MM/DD/YYYY.
     Returns "" when parsing fails.
     """
+    raw_date, branch = search_date(text, date_patterns)
+    if not raw_date:
+        return ""  # Nothing found
+    return normalize_date(raw_date, branch)
 
-    # 1) ----------------------------------------------------------------
-    # All regex formats we accept
-    month_name = r"(January|February|March|April|May|June|July|August|" \
-                 r"September|October|November|December)\s+\d{1,2},\s+\d{4}"
-    ordinal_dm = r"\d{1,2}(?:st|nd|rd|th)?\s+" \
-                 r"(January|February|March|April|May|June|July|August|" \
-                 r"September|October|November|December)\s+\d{4}"
-    numeric    = r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}"
-    iso        = r"\d{4}-\d{2}-\d{2}"
-    dots_eu    = r"\d{1,2}\.\d{1,2}\.\d{2,4}"
-    abbr_mdy   = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{4}"
-    abbr_dmy   = r"\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}"
-
-    date_union = f"({month_name}|{ordinal_dm}|{abbr_mdy}|{abbr_dmy}|{numeric}|{iso}|{dots_eu})"
-
-    # 2) ----------------------------------------------------------------
-    # Candidate date string, empty by default
-    raw_date = ""
-
-    # 2a) Anchored search
-    for anchor in date_patterns:
-        anchor_regex = rf"{re.escape(anchor)}\s*[:\-]?\s*{date_union}"
-        m = re.search(anchor_regex, text, flags=re.IGNORECASE)
-        if m:
-            raw_date = m.group(m.lastindex)
+def extract_dates(texts: list, date_patterns: list) -> list:
+    """
+    Batch version of extract_date: the anchor regex is compiled once and
+    identical texts are parsed once. Returns one date (or "") per text.
+    """
+    parsed = {}
+    for text in texts:
+        if text not in parsed:
+            parsed[text] = extract_date(text, date_patterns)
+    return [parsed[text] for text in texts]
+
+# ================================================================================
+# Compiled matcher for PDF category terms
+# ================================================================================
+
+def compile_pdf_category_rules(folder_categories: dict) -> list:
+    """
+    Flatten `folder_categories` into the priority order used for PDF
+    classification, keeping only subcategories with
+    'file_category_extraction' terms. Terms are lower-cased once here.
+
+    Returns a list of (folder_category, file_category, rules, terms).
+    """
+    compiled = []
+    for folder_category, subcats in folder_categories.items():
+        for file_category, rules in subcats.items():
+            terms = tuple(dict.fromkeys(
+                term.lower() for term in rules.get("file_category_extraction", []) if term
+            ))
+            if terms:
+                compiled.append((folder_category, file_category, rules, terms))
+    return compiled
+
+def match_pdf_category(text: str, compiled_rules: list = None):
+    """
+    Return the first (folder_category, file_category, rules, terms) entry,
+    in category priority order, with a term contained in `text`, or None.
+    The text is lower-cased once for all terms.
+    """
+    text_lower = text.lower()
+    for entry in (PDF_CATEGORY_RULES if compiled_rules is None else compiled_rules):
+        if any(term in text_lower for term in entry[3]):
+            return entry
+    return None
+
+# Compiled once at import so every PDF reuses the same matcher
+PDF_CATEGORY_RULES = compile_pdf_category_rules(dt.folder_categories)
+
+
+# ================================================================================
+# Compiled matcher for filename keywords
+# ================================================================================
+FILENAME_WILDCARD = "any"   # keywords of just ["any"] match every file with the rule's extension(s)
+
+def compile_filename_rules(folder_categories: dict) -> dict:
+    """
+    Partition `folder_categories` by file extension for filename
+    classification. 'extension' may be a string or a list. Every extension
+    keeps its subcategories in category priority order, with the keywords
+    of each one joined into a single regex (None for the wildcard); rules
+    after a wildcard can never match and are dropped.
+
+    Returns {extension: [(folder_category, file_category, rules, regex)]}.
+    """
+    compiled = {}
+    for folder_category, subcats in folder_categories.items():
+        for file_category, rules in subcats.items():
+            keywords = rules.get("keywords", [])
+            if not keywords:
+                continue
+            regex = (None if list(keywords) == [FILENAME_WILDCARD]
+                     else re.compile("|".join(re.escape(kw) for kw in keywords)))
+
+            extensions = rules.get("extension", "")
+            for ext in ([extensions] if isinstance(extensions, str) else extensions):
+                entries = compiled.setdefault(ext.lower(), [])
+                if not entries or entries[-1][3] is not None:
+                    entries.append((folder_category, file_category, rules, regex))
+    return compiled
+
+def match_filename_category(file: str, compiled_rules: dict = None):
+    """
+    Return the first (folder_category, file_category, rules, regex) entry,
+    in category priority order, for the extension of `file` whose keywords
+    occur in the lower-cased name, or None.
+    """
+    file_lower = file.lower()
+    file_ext   = file_lower.split(".")[-1] if "." in file_lower else ""
+    for entry in (FILENAME_RULES if compiled_rules is None else compiled_rules).get(file_ext, ()):
+        if entry[3] is None or entry[3].search(file_lower):
+            return entry
+    return None
+
+def classify_filename(file: str, file_date: str = None, compiled_rules: dict = None) -> dict:
+    """
+    Metadata of one file from its name alone: folder & file category, the
+    date in the name (`file_date` when already extracted) and the country
+    (LIA) or trailing number. PDFs and MSGs without a matching rule go to
+    'Supporting Documents', everything else to 'Uncategorized'.
+    """
+    entry = match_filename_category(file, compiled_rules)
+    if entry:
+        folder_category, file_category, rules, _ = entry
+        trailing_terms = rules.get("trailing_number_extraction", [])
+        country_terms  = rules.get("country_extraction", [])      # anchors for LIA (may remain empty)
+    else:
+        file_ext = file.split(".")[-1].lower() if "." in file else ""
+        if file_ext in ("pdf", "msg"):
+            folder_category, file_category = "Supporting Documents", "Supporting Document"
+        else:
+            folder_category, file_category = "Uncategorized", "Uncategorized"
+        trailing_terms, country_terms = [], []
+
+    trailing_no = ""
+    if file_category == "LIA":
+        trailing_no = extract_lia_country(
+            text="",                        # no PDF text here
+            patterns=country_terms,
+            filename=file
+        )
+    elif trailing_terms:
+        trailing_no = extract_trailing_number(file, trailing_terms)
+
+    return {
+        "file"            : file,
+        "category"        : folder_category,
+        "subcategory"     : file_category,
+        "date"            : (extract_date(file, []) if file_date is None else file_date) or "",
+        "amendment_number": trailing_no.strip()
+    }
+
+def classify_filenames(files: list, compiled_rules: dict = None) -> list:
+    """
+    Batch version of classify_filename for a whole directory listing:
+    dates are extracted in one extract_dates batch. Returns one metadata
+    dict per file, in order.
+    """
+    return [classify_filename(file, file_date, compiled_rules)
+            for file, file_date in zip(files, extract_dates(files, []))]
+
+# Compiled once at import so every file name reuses the same matcher
+FILENAME_RULES = compile_filename_rules(dt.folder_categories)
+
+
+# ================================================================================
+# Streaming scan of PDF text
+# ================================================================================
+# Pages are scanned one window at a time: the page plus the last SCAN_OVERLAP
+# characters before it, so terms and anchors split across a page break still
+# match. Only the first occurrence of every anchor is kept, so the memory used
+# per document does not grow with its page count. A match ending in the last
+# SCAN_MARGIN characters of a window may still be cut short, so it is only
+# taken from the next window (or from the tail once the pages run out).
+
+SCAN_OVERLAP = 2048   # Characters of earlier text kept in front of each page
+SCAN_MARGIN  = 256    # Matches ending this close to the end of a window are deferred
+
+def new_scan_state(compiled_rules: list = None) -> dict:
+    """Empty scan state for the rules of compile_pdf_category_rules."""
+    rules = PDF_CATEGORY_RULES if compiled_rules is None else compiled_rules
+    date_keys, trailing_patterns, country_patterns = [], [], []
+    for _, _, category_rules, _ in rules:
+        key = tuple(category_rules.get("date_extraction", []))
+        if key and key not in date_keys:
+            date_keys.append(key)
+        trailing_patterns += [p for p in category_rules.get("trailing_number_extraction", []) if p not in trailing_patterns]
+        country_patterns  += [p for p in category_rules.get("country_extraction", []) if p not in country_patterns]
+
+    return {
+        "rules"            : rules,
+        "first_match"      : None,                        # Index of the highest-priority rule seen so far
+        "dates"            : {key: {} for key in date_keys},   # {anchors: {anchor priority: (raw, branch)}}
+        "any_date"         : None,                        # First date anywhere, the fallback of every rule
+        "trailing_patterns": trailing_patterns,
+        "trailing"         : {},                          # {anchor: first value}
+        "country_patterns" : country_patterns,
+        "countries"        : {},                          # {anchor: country after its first occurrence}
+    }
+
+def scan_window(state: dict, window: str, final_end: int):
+    """
+    Update `state` with one window of text. Matches ending after
+    `final_end` are left for the next window.
+    """
+    # --- Category terms: only rules of higher priority than the best one seen
+    lowered = window.lower()
+    limit = len(state["rules"]) if state["first_match"] is None else state["first_match"]
+    for index in range(limit):
+        if any(term in lowered for term in state["rules"][index][3]):
+            state["first_match"] = index
             break
 
-    # 2b) Generic search
-    if not raw_date:
-        m = re.search(date_union, text, flags=re.IGNORECASE)
-        if m:
-            raw_date = m.group(0)
+    # --- Dates: first occurrence per anchor priority, and the first date anywhere
+    for patterns, firsts in state["dates"].items():
+        if 0 not in firsts:
+            scan_date_anchors(patterns, window, final_end, firsts)
+    if state["any_date"] is None:
+        m = DATE_REGEX.search(window)
+        if m and m.end() <= final_end:
+            state["any_date"] = (m.group(0), m.lastgroup)
+
+    # --- Trailing numbers: first occurrence per anchor
+    for pattern in state["trailing_patterns"]:
+        if pattern not in state["trailing"]:
+            m = compile_trailing_number(pattern).search(window)
+            # A token too long to reach the next window whole is taken as is
+            if m and (m.end() <= final_end or m.start() <= len(window) - SCAN_OVERLAP):
+                state["trailing"][pattern] = m.group(1).strip()
+
+    # --- LIA countries: the country after the first occurrence of each anchor
+    patterns = state["country_patterns"]
+    for pattern, rx in zip(patterns, compile_country_anchors(tuple(patterns))):
+        if pattern not in state["countries"]:
+            m = rx.search(window)
+            # A run of words longer than the lookahead is decided by its first part
+            if m and (m.end() <= final_end or
+                      m.end() - m.start(1) > COUNTRY_LOOKAHEAD and m.start(1) + COUNTRY_LOOKAHEAD <= final_end):
+                state["countries"][pattern] = country_after_anchor(m, window)
+
+def scan_date_anchors(patterns: tuple, window: str, final_end: int, firsts: dict):
+    """Record in `firsts` the first date after each anchor of `patterns` (see search_date)."""
+    regex = compile_date_anchors(patterns)
+    if len(patterns) == 1:
+        m = regex.search(window)
+        if m and m.end() <= final_end:
+            firsts.setdefault(0, (m.group(m.lastgroup), m.lastgroup))
+        return
+
+    for m in regex.finditer(window):
+        if m.end(m.lastgroup) > final_end:
+            break
+        priority = next(i for i in range(len(patterns)) if m.group(f"anchor{i}") is not None)
+        firsts.setdefault(priority, (m.group(m.lastgroup), m.lastgroup))
+        if priority == 0:
+            break
 
-    if not raw_date:
-        return ""  # Nothing found
+def scan_date(state: dict, date_patterns: list) -> str:
+    """extract_date over everything scanned so far."""
+    firsts = state["dates"].get(tuple(date_patterns), {})
+    raw_date, branch = firsts[min(firsts)] if firsts else (state["any_date"] or ("", ""))
+    return normalize_date(raw_date, branch) if raw_date else ""
+
+def scan_trailing_number(state: dict, trailing_patterns: list) -> str:
+    """extract_trailing_number over everything scanned so far."""
+    for pattern in trailing_patterns:
+        if pattern in state["trailing"]:
+            return state["trailing"][pattern]
+    return ""
+
+def scan_lia_country(state: dict, patterns: list, filename: str = "") -> str:
+    """extract_lia_country over everything scanned so far, then `filename`."""
+    for pattern in patterns:
+        if state["countries"].get(pattern):
+            return state["countries"][pattern]
+    return extract_lia_country("", patterns, filename) if filename else ""
+
+def scan_resolved(state: dict) -> bool:
+    """
+    True once a category matched and the first-listed anchor of every value
+    its rules define has matched. The any-date fallback and lower-priority
+    anchors never settle a value, since a later page could still override them.
+    """
+    if state["first_match"] is None:
+        return False
+    _, file_category, rules, _ = state["rules"][state["first_match"]]
+    if rules.get("date_extraction") and 0 not in state["dates"][tuple(rules["date_extraction"])]:
+        return False
+    if file_category == "LIA":
+        return not rules.get("country_extraction") or bool(state["countries"].get(rules["country_extraction"][0]))
+    return not rules.get("trailing_number_extraction") or rules["trailing_number_extraction"][0] in state["trailing"]
+
+def scan_pdf_pages(page_texts, filename: str, early_stop: bool = False, page_budget: int = None,
+                   compiled_rules: list = None):
+    """
+    Classify a document from an iterable of page texts. Gives the same
+    result as match_pdf_category / extract_date / extract_trailing_number /
+    extract_lia_country on the pages joined with spaces, while holding
+    only one window of text at a time.
+
+    Stops after `page_budget` pages, or with `early_stop` as soon as
+    scan_resolved (the first category seen on the pages read so far wins).
+    Returns the metadata dict, or None when no category matches.
+    """
+    state = new_scan_state(compiled_rules)
+    tail, pages = "", 0
+
+    for page_text in page_texts:
+        pages += 1
+        window = f"{tail} {page_text}" if pages > 1 else page_text
+        scan_window(state, window, len(window) - SCAN_MARGIN)
+        tail = window[-SCAN_OVERLAP:]
+        if early_stop and scan_resolved(state):
+            break
+        if page_budget and pages >= page_budget:
+            break
+
+    scan_window(state, tail, len(tail))   # Matches deferred at the end of the last window
+
+    if state["first_match"] is None:
+        return None
+    folder_category, file_category, rules, _ = state["rules"][state["first_match"]]
 
-    # 3) ----------------------------------------------------------------
-    # Normalization to MM/DD/YYYY
-    raw_date = raw_date.strip()
-    raw_date = re.sub(r"(\d{1,2})(st|nd|rd|th)", r"\1", raw_date, flags=re.I)
-
-    patterns = [
-        "%B %d, %Y",     # January 5, 2024
-        "%d %B %Y",      # 5 January 2024
-        "%b %d, %Y",     # Jan 5, 2024
-        "%d %b %Y",      # 5 Jan 2024
-        "%m/%d/%Y",      # 05/01/2024
-        "%m/%d/%y",      # 05/01/24
-        "%d-%m-%Y",      # 5-1-2024
-        "%d-%m-%y",      # 5-1-24
-        "%Y-%m-%d",      # 2024-01-05
-        "%d.%m.%Y",      # 5.1.2024
-        "%d.%m.%y",      # 5.1.24
-    ]
-
-    for fmt in patterns:
+    if file_category == "LIA":
+        trailing_number = scan_lia_country(state, rules.get("country_extraction", []), filename)
+    else:
+        trailing_number = scan_trailing_number(state, rules.get("trailing_number_extraction", []))
+
+    return {
+        "file"            : filename,
+        "category"        : folder_category,
+        "subcategory"     : file_category,
+        "date"            : scan_date(state, rules.get("date_extraction", [])),
+        "amendment_number": trailing_number.strip()
+    }
+
+
+# ================================================================================
+# === PDF text backends ==========================================================
+# ================================================================================
+# A backend is a generator (file_path, start, stop) -> text of each page in
+# range(start, stop), registered in PDF_BACKENDS together with the module whose version
+# keys the text cache. dt.pdf_backend picks the backend of a run.
+
+RAW_X_TOLERANCE = 3.0   # Horizontal gap (points) written as a space by the raw backend
+RAW_Y_TOLERANCE = 3.0   # Vertical move (points) written as a line break by the raw backend
+
+def iter_pages_pdfplumber(file_path: str, start: int = 0, stop: int = None):
+    """Layout-aware text of each page (pdfplumber's extract_text), one page at a time."""
+    import pdfplumber # This module is used to extract text and metadata from PDF files
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            yield page.extract_text() or ""
+            page.close()   # Drop the page's parsed objects before reading the next one
+
+@functools.lru_cache(maxsize=None)
+def raw_text_device():
+    """
+    Build (once) a pdfminer device that writes characters in content-stream
+    order. No layout analysis and no per-character layout objects: a space
+    is written for a horizontal gap and a line break when the baseline
+    moves, which is all the anchor and keyword matching needs.
+    """
+    from pdfminer.pdfdevice import PDFTextDevice # This module provides the text-rendering device interface of pdfminer
+    from pdfminer.pdffont import PDFUnicodeNotDefined # This exception marks glyphs without a Unicode mapping
+
+    class RawTextDevice(PDFTextDevice):
+        def __init__(self, rsrcmgr):
+            super().__init__(rsrcmgr)
+            self.chunks = []
+            self.last_position = None
+
+        def reset(self):
+            self.chunks = []
+            self.last_position = None
+
+        def render_char(self, matrix, font, fontsize, scaling, rise, cid, *args):
+            try:
+                text = font.to_unichr(cid)
+            except PDFUnicodeNotDefined:
+                text = ""
+            width = font.char_width(cid) * fontsize * scaling
+            x, y = matrix[4], matrix[5]
+
+            if self.last_position is not None:
+                last_x, last_y = self.last_position
+                if abs(y - last_y) > RAW_Y_TOLERANCE:
+                    self.chunks.append("\n")
+                elif x - last_x > RAW_X_TOLERANCE:
+                    self.chunks.append(" ")
+            self.chunks.append(text)
+            self.last_position = (x + width * matrix[0], y)
+            return width
+
+    return RawTextDevice
+
+def iter_pages_pdfminer_raw(file_path: str, start: int = 0, stop: int = None):
+    """Text of each page in content-stream order (pdfminer without layout analysis)."""
+    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter # This module interprets PDF content streams
+    from pdfminer.pdfpage import PDFPage # This module iterates the pages of a PDF document
+
+    resources = PDFResourceManager(caching=True)
+    device = raw_text_device()(resources)
+    interpreter = PDFPageInterpreter(resources, device)
+    with open(file_path, "rb") as fh:
+        for page in itertools.islice(PDFPage.get_pages(fh), start, stop):
+            device.reset()
+            interpreter.process_page(page)
+            yield "".join(device.chunks)
+
+PDF_BACKENDS = {
+    "pdfplumber"  : (iter_pages_pdfplumber, "pdfplumber"),
+    "pdfminer-raw": (iter_pages_pdfminer_raw, "pdfminer"),
+}
+
+def get_pdf_backend(name: str = None):
+    """Return the page generator of backend `name` (default dt.pdf_backend)."""
+    name = name or dt.pdf_backend
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{name}'. Available: {', '.join(PDF_BACKENDS)}")
+    return PDF_BACKENDS[name][0]
+
+def pdf_page_count(file_path: str) -> int:
+    """Page count from the PDF's page tree, without parsing any page (0 when unreadable)."""
+    from pdfminer.pdfparser import PDFParser # This module parses the PDF file structure
+    from pdfminer.pdfdocument import PDFDocument # This module reads the document catalog
+    from pdfminer.pdftypes import resolve1 # This function resolves indirect PDF objects
+
+    try:
+        with open(file_path, "rb") as fh:
+            pages = resolve1(PDFDocument(PDFParser(fh)).catalog["Pages"])
+            return int(resolve1(pages.get("Count", 0)))
+    except Exception as e:
+        logger.debug(f"Could not read the page count of '{os.path.basename(file_path)}': {e}")
+        return 0
+
+def extract_page_range(name: str, file_path: str, start: int, stop: int) -> list:
+    """Text of pages start..stop-1 with backend `name`; run by the workers of iter_pages_split."""
+    return list(get_pdf_backend(name)(file_path, start=start, stop=stop))
+
+def iter_pages_split(name: str, file_path: str, start: int, page_count: int):
+    """
+    Yield the pages of a large PDF from `start` on, in order, reading
+    ranges of dt.pdf_split_chunk pages in dt.pdf_split_workers processes
+    (None = one per CPU core) that each open the file on their own. At most
+    two ranges per worker are in flight, so a caller that stops early does
+    not wait for the rest of the document.
+
+    `page_count` (from the page tree) only lays out the ranges: the last
+    range reads on until the backend runs out of pages, so a page tree that
+    understates the page count does not lose the trailing pages.
+    """
+    chunk   = max(1, dt.pdf_split_chunk or 1)
+    ranges  = [(first, min(first + chunk, page_count)) for first in range(start, page_count, chunk)] or [(start, None)]
+    ranges[-1] = (ranges[-1][0], None)
+    workers = max(1, min(dt.pdf_split_workers or os.cpu_count() or 1, len(ranges)))
+    logger.debug(f"Reading {page_count - start} pages of '{os.path.basename(file_path)}' "
+                 f"in {len(ranges)} ranges with {workers} workers")
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=worker_initargs())
+    in_flight = collections.deque()
+    read = 0
+    try:
+        for index, (first, stop) in enumerate(ranges):
+            in_flight.append(pool.submit(extract_page_range, name, file_path, first, stop))
+            while in_flight and (len(in_flight) >= 2 * workers or index == len(ranges) - 1):
+                pages = in_flight.popleft().result()
+                read += len(pages)
+                yield from pages
+        if start + read > page_count:
+            logger.warning(f"'{os.path.basename(file_path)}' has {start + read} pages, "
+                           f"its page tree says {page_count}")
+    finally:
+        # Cancel the ranges not started yet (shutdown(cancel_futures=True) needs Python 3.9) and only
+        # wait for the running ones: on 3.8, an executor shut down without waiting breaks when collected
+        for future in in_flight:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+def pdf_backend_version(name: str = None) -> str:
+    """
+    Version key of a text extraction backend (default dt.pdf_backend).
+    Cached pages are only reused when this key matches, so switching
+    backends or upgrading the library behind one invalidates them.
+    """
+    name = name or dt.pdf_backend
+    get_pdf_backend(name)
+    module = importlib.import_module(PDF_BACKENDS[name][1])
+    return f"{name}-{module.__version__}"
+
+
+# ================================================================================
+# Persistent cache of extracted PDF text
+# ================================================================================
+
+_TEXT_CACHE_SCHEMA = 2
+_text_cache_connections = {}   # {(pid, cache_path): sqlite3.Connection}
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file, read in `chunk_size` blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def open_text_cache(cache_path: str) -> sqlite3.Connection:
+    """
+    Open (and create if needed) the SQLite text cache at `cache_path`.
+    Connections are reused per process; WAL mode lets several Step 2
+    workers read and write the same cache concurrently.
+    """
+    key = (os.getpid(), cache_path)
+    conn = _text_cache_connections.get(key)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(cache_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != _TEXT_CACHE_SCHEMA:
+        conn.executescript(f"""
+            DROP TABLE IF EXISTS pages;
+            DROP TABLE IF EXISTS documents;
+            CREATE TABLE documents (
+                content_hash TEXT    NOT NULL,
+                backend      TEXT    NOT NULL,
+                page_count   INTEGER NOT NULL,
+                complete     INTEGER NOT NULL,
+                bytes        INTEGER NOT NULL,
+                last_used    REAL    NOT NULL,
+                PRIMARY KEY (content_hash, backend)
+            );
+            CREATE INDEX documents_last_used ON documents (last_used);
+            CREATE TABLE pages (
+                content_hash TEXT    NOT NULL,
+                backend      TEXT    NOT NULL,
+                page_no      INTEGER NOT NULL,
+                text         TEXT    NOT NULL,
+                PRIMARY KEY (content_hash, backend, page_no)
+            );
+            PRAGMA user_version = {_TEXT_CACHE_SCHEMA};
+        """)
+    _text_cache_connections[key] = conn
+    return conn
+
+def get_cached_document(conn: sqlite3.Connection, content_hash: str, backend: str):
+    """
+    Return (page_count, complete) for a cached document, or None on a cache
+    miss. `complete` is False when only the first pages were read. A hit
+    marks the document as recently used.
+    """
+    row = conn.execute(
+        "SELECT page_count, complete FROM documents WHERE content_hash = ? AND backend = ?",
+        (content_hash, backend),
+    ).fetchone()
+    if row is None:
+        return None
+
+    stored = conn.execute(
+        "SELECT COUNT(*) FROM pages WHERE content_hash = ? AND backend = ?",
+        (content_hash, backend),
+    ).fetchone()[0]
+    if stored != row[0]:
+        return None  # Inconsistent entry, extract again
+
+    with conn:
+        conn.execute(
+            "UPDATE documents SET last_used = ? WHERE content_hash = ? AND backend = ?",
+            (time.time(), content_hash, backend),
+        )
+    return row[0], bool(row[1])
+
+def iter_cached_pages(conn: sqlite3.Connection, content_hash: str, backend: str):
+    """Yield the cached page texts of a document in page order, straight from the cursor."""
+    for (text,) in conn.execute(
+        "SELECT text FROM pages WHERE content_hash = ? AND backend = ? ORDER BY page_no",
+        (content_hash, backend),
+    ):
+        yield text
+
+def put_cached_pages(conn: sqlite3.Connection, content_hash: str, backend: str,
+                     pages: list, complete: bool = True, max_bytes: int = None,
+                     first_page: int = 0) -> bool:
+    """
+    Store the page texts of a document from page `first_page` on (the
+    earlier pages must already be stored), marking it `complete` or not,
+    then evict the least recently used documents until the cache holds
+    at most `max_bytes` of text. Returns False when the earlier pages
+    are gone (evicted meanwhile) and nothing was stored.
+    """
+    size = sum(len(text.encode("utf-8")) for text in pages)
+    with conn:
+        if first_page:
+            row = conn.execute(
+                "SELECT page_count, bytes FROM documents WHERE content_hash = ? AND backend = ?",
+                (content_hash, backend),
+            ).fetchone()
+            if row is None or row[0] != first_page:
+                return False
+            size += row[1]
+        else:
+            conn.execute("DELETE FROM pages WHERE content_hash = ? AND backend = ?", (content_hash, backend))
+        conn.executemany(
+            "INSERT OR REPLACE INTO pages (content_hash, backend, page_no, text) VALUES (?, ?, ?, ?)",
+            [(content_hash, backend, first_page + page_no, text) for page_no, text in enumerate(pages)],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (content_hash, backend, page_count, complete, bytes, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (content_hash, backend, first_page + len(pages), int(complete), size, time.time()),
+        )
+
+    if max_bytes is not None:
+        evict_text_cache(conn, max_bytes)
+    return True
+
+def evict_text_cache(conn: sqlite3.Connection, max_bytes: int):
+    """Delete least recently used documents until the cached text fits in `max_bytes`."""
+    total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM documents").fetchone()[0]
+    if total <= max_bytes:
+        return
+
+    victims = []
+    for content_hash, backend, size in conn.execute(
+        "SELECT content_hash, backend, bytes FROM documents ORDER BY last_used"
+    ):
+        if total <= max_bytes:
+            break
+        victims.append((content_hash, backend))
+        total -= size
+
+    with conn:
+        conn.executemany("DELETE FROM pages WHERE content_hash = ? AND backend = ?", victims)
+        conn.executemany("DELETE FROM documents WHERE content_hash = ? AND backend = ?", victims)
+    logger.debug(f"Evicted {len(victims)} documents from the PDF text cache")
+
+TEXT_CACHE_FLUSH_BYTES = 4 << 20   # Newly read page text written to the cache in batches of this size
+
+def iter_pdf_pages(file_path: str, cache_path: str = None, backend: str = None, content_hash: str = None):
+    """
+    Yield the text of each page of a PDF, read with `backend` (default
+    dt.pdf_backend) only when the caller asks for the next page, so a
+    caller that stops early never pays for the remaining pages.
+
+    When `cache_path` is given, cached pages (looked up by the file's
+    content hash, computed unless passed as `content_hash`) are streamed first. Newly read pages are written to the
+    cache in TEXT_CACHE_FLUSH_BYTES batches and when the caller stops, so a
+    partial entry is extended by a later longer read and no more than one
+    batch of text is held in memory. Cache failures never stop
+    classification.
+    """
+    started = (time.perf_counter(), time.thread_time())
+    conn = None
+    backend_name = backend or dt.pdf_backend
+    iter_pages = get_pdf_backend(backend_name)
+    backend = pdf_backend_version(backend_name)
+    cached_pages, complete = 0, False
+
+    if cache_path:
         try:
-            dt = datetime.strptime(raw_date, fmt)
-            return dt.strftime("%m/%d/%Y")
-        except ValueError:
-            continue
+            content_hash = content_hash or file_sha256(file_path)
+            conn = open_text_cache(cache_path)
+            cached_pages, complete = get_cached_document(conn, content_hash, backend) or (0, False)
+        except sqlite3.Error as e:
+            logger.warning(f"PDF text cache unavailable ({cache_path}): {e}")
+            conn = None
+
+    cached_complete = complete
+    stored = cached_pages     # Pages already in the cache
+    pending = []              # Pages read but not written to the cache yet
+    pending_bytes = served = 0
+    failed = False
+
+    def flush(done: bool):
+        nonlocal conn, stored, pending, pending_bytes
+        try:
+            if put_cached_pages(conn, content_hash, backend, pending, done,
+                                max_bytes=dt.text_cache_max_mb * 1024 * 1024, first_page=stored):
+                stored += len(pending)
+            else:
+                conn = None   # Earlier pages were evicted meanwhile, stop caching this document
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store '{os.path.basename(file_path)}' in the PDF text cache: {e}")
+            conn = None
+        pending, pending_bytes = [], 0
 
-    # Could not parse
-    return ""
+    try:
+        if cached_pages:
+            for text in iter_cached_pages(conn, content_hash, backend):
+                served += 1
+                yield text
+        if not complete:
+            # Huge PDFs are split across processes by page range (see iter_pages_split)
+            page_count = pdf_page_count(file_path) if dt.pdf_split_pages else 0
+            if dt.pdf_split_pages and page_count > dt.pdf_split_pages:
+                page_texts = iter_pages_split(backend_name, file_path, cached_pages, page_count)
+            else:
+                page_texts = iter_pages(file_path, start=cached_pages)
+
+            for text in page_texts:
+                served += 1
+                if conn is not None:
+                    pending.append(text)
+                    pending_bytes += len(text)
+                    if pending_bytes >= TEXT_CACHE_FLUSH_BYTES:
+                        flush(done=False)
+                yield text
+            complete = True
+    except Exception:
+        failed = True
+        raise
+    finally:
+        if not failed:
+            count_pdf(file_path, served, started, cached=0 < served <= cached_pages)
+            if conn is not None and (pending or complete != cached_complete):
+                flush(done=complete)
+
+def extract_pdf_pages(file_path: str, cache_path: str = None, backend: str = None) -> list:
+    """Return the text of every page of a PDF (see iter_pdf_pages)."""
+    return list(iter_pdf_pages(file_path, cache_path, backend))
+
+def count_pdf(file_path: str, page_count: int, started: tuple, cached: bool):
+    """Add one parsed PDF to the run metrics. `started` is (perf_counter, thread_time)."""
+    seconds = time.perf_counter() - started[0]
+    size = os.path.getsize(file_path)
+    add_stage_time("step_2.pdf_parse", seconds, time.thread_time() - started[1])
+    count("pdf_files")
+    count("pdf_pages", page_count)
+    count("pdf_bytes", size)
+    if cached:
+        count("pdf_cache_hits")
+    record_pdf(seconds, file_path, page_count, size, cached)
 
- 
-# Initialize the logger
-logger = setup_log()
+# ================================================================================
+# Processed-archive manifest (incremental runs)
+# ================================================================================
+
+def compute_rules_version() -> str:
+    """
+    Short hash of the classification rules in data.py. Archives processed
+    under a different rules version are reprocessed.
+    """
+    rules = {
+        "folder_categories": dt.folder_categories,
+        "countries": {name: sorted(aliases) for name, aliases in dt.countries.items()},
+    }
+    payload = json.dumps(rules, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+RULES_VERSION = compute_rules_version()
+
+def load_manifest(dest_path: str) -> dict:
+    """Return {archive path relative to the source: entry} from dest_path, or {}."""
+    manifest_path = os.path.join(dest_path, dt.manifest_name)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read manifest {manifest_path}, starting a new one: {e}")
+        return {}
+
+def save_manifest(dest_path: str, manifest: dict):
+    """Write the manifest atomically so an interrupted run never leaves it half-written."""
+    manifest_path = os.path.join(dest_path, dt.manifest_name)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+def archive_fingerprint(file_path: str, entry: dict = None) -> dict:
+    """
+    Size, mtime and SHA-256 of an archive. The hash of `entry` is reused
+    when size and mtime have not changed, so unchanged archives are not read.
+    """
+    stat = os.stat(file_path)
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+        fingerprint["sha256"] = entry.get("sha256")
+    else:
+        fingerprint["sha256"] = file_sha256(file_path)
+    return fingerprint
+
+def archive_unchanged(entry: dict, fingerprint: dict) -> bool:
+    """True when a manifest entry was fully processed from the same content and rules."""
+    return (
+        entry.get("sha256") == fingerprint["sha256"]
+        and entry.get("rules_version") == RULES_VERSION
+        and entry.get("rows") is not None
+    )
+
+def record_manifest_extraction(manifest: dict, file_path: str, zip_folder_name: str,
+                               file_count: int, source_base: str):
+    """Add or refresh the manifest entry of an archive that was just extracted."""
+    key = os.path.relpath(file_path, source_base)
+    manifest[key] = {
+        "workspace"    : zip_folder_name,
+        **archive_fingerprint(file_path, manifest.get(key)),
+        "rules_version": RULES_VERSION,
+        "files"        : file_count,
+        "rows"         : None,   # Filled in after Step 2
+    }
+
+def record_manifest_rows(dest_path: str, results: dict):
+    """
+    After Step 2, store the number of file_resume rows of each workspace in
+    `results` ({zip_folder_name: (file_resume, contract_resume)}), which
+    marks its archive as fully processed. Workspaces whose Step 2 failed
+    (an empty frame without columns) stay pending for the next run.
+    """
+    if not dt.incremental_runs:
+        return
+    manifest = load_manifest(dest_path)
+    for entry in manifest.values():
+        if entry.get("workspace") in results:
+            file_resume, _ = results[entry["workspace"]]
+            if len(file_resume.columns):
+                entry["rows"] = len(file_resume)
+    save_manifest(dest_path, manifest)
+
+# ================================================================================
+# === Run metrics: stage timings, counters, slowest PDFs and profiling ===========
+# ================================================================================
+
+_metrics_lock = threading.Lock()
+
+def new_metrics() -> dict:
+    """Empty metrics: stage timings, counters and a min-heap of the slowest PDFs."""
+    return {"stages": {}, "counters": {}, "slowest_pdfs": []}
+
+RUN_METRICS = new_metrics()   # This process's metrics; workers send theirs back with every result
+
+def add_stage_time(name: str, wall: float, cpu: float, calls: int = 1):
+    with _metrics_lock:
+        stage = RUN_METRICS["stages"].setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+        stage["calls"]  += calls
+        stage["wall_s"] += wall
+        stage["cpu_s"]  += cpu
+
+@contextlib.contextmanager
+def track_stage(name: str):
+    """
+    Add the wall time and the CPU time (of the calling thread) spent in
+    the `with` block to stage `name`. Repeated calls add up, so a stage run
+    by several threads or workers reports the sum of their times.
+    """
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        add_stage_time(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+def timed_stage(name: str):
+    """Decorator form of track_stage."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name: str, amount: int = 1):
+    with _metrics_lock:
+        RUN_METRICS["counters"][name] = RUN_METRICS["counters"].get(name, 0) + amount
+
+def record_pdf(seconds: float, file_path: str, pages: int, size: int, cached: bool):
+    """Keep the dt.metrics_slowest_pdfs slowest PDFs seen by this process."""
+    item = (seconds, file_path, pages, size, cached)
+    with _metrics_lock:
+        slowest = RUN_METRICS["slowest_pdfs"]
+        if len(slowest) < dt.metrics_slowest_pdfs:
+            heapq.heappush(slowest, item)
+        elif slowest and item > slowest[0]:
+            heapq.heapreplace(slowest, item)
+
+def take_metrics() -> dict:
+    """Return this process's metrics and start a fresh set."""
+    global RUN_METRICS
+    with _metrics_lock:
+        metrics, RUN_METRICS = RUN_METRICS, new_metrics()
+    return metrics
+
+def merge_metrics(metrics: dict):
+    """Fold the metrics returned by a worker process into this process's metrics."""
+    for name, stage in metrics["stages"].items():
+        add_stage_time(name, stage["wall_s"], stage["cpu_s"], stage["calls"])
+    for name, amount in metrics["counters"].items():
+        count(name, amount)
+    for item in metrics["slowest_pdfs"]:
+        record_pdf(*item)
+
+def format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+def log_progress(label: str, done: int, total: int, started: float):
+    """Log `done`/`total` with the throughput so far and the estimated time left."""
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate else 0.0
+    logger.info(f"⏱️ {label}: {done}/{total} | {rate:.2f}/s | "
+                f"elapsed {format_seconds(elapsed)} | ETA {format_seconds(eta)}")
+
+def start_profiler():
+    """Start a cProfile profiler when dt.profile_enabled, otherwise return None."""
+    if not dt.profile_enabled:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def stop_profiler(profiler, dest_path: str, name: str):
+    """Stop `profiler` and save it as <dest_path>/<dt.profile_folder>/<name>.pstats."""
+    if profiler is None:
+        return
+    profiler.disable()
+    profile_dir = os.path.join(dest_path, dt.profile_folder)
+    os.makedirs(profile_dir, exist_ok=True)
+    profile_path = os.path.join(profile_dir, f"{name}.pstats")
+    profiler.dump_stats(profile_path)
+    logger.debug(f"🔬 Profile saved → {profile_path}")
+
+def write_metrics(dest_path: str) -> str:
+    """
+    Write this process's metrics (worker metrics already merged) to
+    <dest_path>/<dt.metrics_name> and start a fresh set. Stage times of
+    work done in parallel (ZIP extraction, workspaces, PDFs) are summed
+    over threads and workers, so they can exceed the run's wall time.
+    """
+    metrics  = take_metrics()
+    stages   = metrics["stages"]
+    counters = metrics["counters"]
+    wall = sum(stages[name]["wall_s"] for name in ("step_1", "step_2", "steps_1_2", "step_3") if name in stages)
+    pdf_parse = stages.get("step_2.pdf_parse", {}).get("wall_s", 0.0)
+
+    report = {
+        "finished"  : datetime.now().isoformat(timespec="seconds"),
+        "wall_s"    : round(wall, 3),
+        "throughput": {
+            "files_per_s"    : round(counters.get("files_extracted", 0) / wall, 2) if wall else None,
+            "mb_per_s"       : round(counters.get("zip_bytes", 0) / 1048576 / wall, 2) if wall else None,
+            "pdf_pages_per_s": round(counters.get("pdf_pages", 0) / pdf_parse, 2) if pdf_parse else None,
+        },
+        "stages"    : {name: {"calls" : stage["calls"],
+                              "wall_s": round(stage["wall_s"], 3),
+                              "cpu_s" : round(stage["cpu_s"], 3)}
+                       for name, stage in sorted(stages.items())},
+        "counters"  : dict(sorted(counters.items())),
+        "slowest_pdfs": [{"file": file_path, "pages": pages, "bytes": size,
+                          "seconds": round(seconds, 3), "cached": cached}
+                         for seconds, file_path, pages, size, cached
+                         in sorted(metrics["slowest_pdfs"], reverse=True)],
+    }
+
+    metrics_path = os.path.join(dest_path, dt.metrics_name)
+    with open(metrics_path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+    logger.info(f"📊 Run metrics → {metrics_path}")
+    return metrics_path
+
+
+# ================================================================================
+# File catalog: indexed SQLite record of every classified file
+# ================================================================================
+
+_CATALOG_SCHEMA = 1
+_CATALOG_MIGRATIONS = {}   # {schema version: script upgrading a catalog from it to the next version}
+CATALOG_RUNS = {}   # {catalog path: (connection, run id)} of the run in progress, main process only
+
+CATALOG_FILE_COLUMNS = (
+    "contract_id", "category_folder", "supplier_name", "file_category", "amendment_number",
+    "extracted_date", "file_extension", "file_name", "final_path", "content_hash", "duplicate_of", "run_id",
+)
+
+def check_catalog_version(conn: sqlite3.Connection, catalog_path: str):
+    """Raise sqlite3.DatabaseError unless the catalog has the schema version this code reads."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version != _CATALOG_SCHEMA:
+        raise sqlite3.DatabaseError(
+            f"File catalog {catalog_path} has schema version {version}, expected {_CATALOG_SCHEMA}"
+        )
+
+def open_catalog(catalog_path: str) -> sqlite3.Connection:
+    """
+    Open the file catalog at `catalog_path` for writing. The schema is only
+    created in an empty file; an older catalog is upgraded with
+    _CATALOG_MIGRATIONS and any other one is refused (sqlite3.DatabaseError),
+    never dropped. file_category compares case-insensitively, like the
+    missing-document check of step_2, and is indexed alone and per contract.
+    """
+    conn = sqlite3.connect(catalog_path, timeout=60)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0 and not conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+            create_catalog_schema(conn)
+            version = _CATALOG_SCHEMA
+        while version in _CATALOG_MIGRATIONS:
+            conn.executescript(_CATALOG_MIGRATIONS[version])
+            version += 1
+            conn.execute(f"PRAGMA user_version = {version}")
+        check_catalog_version(conn, catalog_path)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+def create_catalog_schema(conn: sqlite3.Connection):
+    """Create the tables and indexes of the current catalog schema in an empty database."""
+    conn.executescript(f"""
+            CREATE TABLE runs (
+                run_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+                started       TEXT    NOT NULL,
+                finished      TEXT,
+                rules_version TEXT    NOT NULL,
+                workspaces    INTEGER NOT NULL DEFAULT 0,
+                files         INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE contracts (
+                contract_id TEXT    PRIMARY KEY,
+                comments    TEXT    NOT NULL,
+                files       INTEGER NOT NULL,
+                run_id      INTEGER NOT NULL
+            );
+            CREATE TABLE files (
+                contract_id      TEXT    NOT NULL,
+                category_folder  TEXT    NOT NULL,
+                supplier_name    TEXT    NOT NULL,
+                file_category    TEXT    NOT NULL COLLATE NOCASE,
+                amendment_number TEXT    NOT NULL,
+                extracted_date   TEXT    NOT NULL,
+                file_extension   TEXT    NOT NULL,
+                file_name        TEXT    NOT NULL,
+                final_path       TEXT    NOT NULL,
+                content_hash     TEXT    NOT NULL,
+                duplicate_of     TEXT    NOT NULL,
+                run_id           INTEGER NOT NULL
+            );
+            CREATE INDEX files_contract ON files (contract_id, file_category);
+            CREATE INDEX files_category ON files (file_category);
+            CREATE INDEX files_hash     ON files (content_hash);
+            PRAGMA user_version = {_CATALOG_SCHEMA};
+        """)
+
+def catalog_run(dest_path: str) -> tuple:
+    """(connection, run id) of the catalog under dest_path, starting a run on first use."""
+    catalog_path = os.path.join(dest_path, dt.catalog_name)
+    if catalog_path not in CATALOG_RUNS:
+        conn = open_catalog(catalog_path)
+        with conn:
+            run_id = conn.execute(
+                "INSERT INTO runs (started, rules_version) VALUES (?, ?)",
+                (datetime.now().isoformat(timespec="seconds"), RULES_VERSION),
+            ).lastrowid
+        CATALOG_RUNS[catalog_path] = (conn, run_id)
+    return CATALOG_RUNS[catalog_path]
+
+def catalog_text(value) -> str:
+    """A resume value as the text written to the CSVs (None and NaN become "")."""
+    return "" if value is None or value != value else str(value)
+
+@timed_stage("catalog")
+def record_catalog(dest_path: str, zip_folder_name: str, result: tuple):
+    """
+    Replace the catalog rows of a workspace with the step_2 `result`
+    (file_resume, contract_resume) as soon as it is classified. Workspaces
+    whose Step 2 failed keep their previous rows. Catalog failures never
+    stop the run.
+    """
+    if not dt.catalog_enabled:
+        return
+    file_resume, contract_resume = result
+    if not len(file_resume.columns):
+        return
+
+    rows = []
+    for values in file_resume.itertuples(index=False, name=None):
+        row = dict(zip(FILE_RESUME_COLUMNS, map(catalog_text, values)))
+        rows.append((
+            zip_folder_name, row["Category Folder"], row["Supplier Name"], row["File Category"],
+            row["Amendment Number"], row["Extracted Date"], row["File Extension"], row["File Original Name"],
+            os.path.join(zip_folder_name, row["Category Folder"], row["File Original Name"]),
+            row["Content Hash"], row["Duplicate Of"],
+        ))
+    comments = " | ".join(catalog_text(comment) for comment in contract_resume.get(CONTRACT_RESUME_COLUMNS[1], []))
+
+    try:
+        conn, run_id = catalog_run(dest_path)
+        with conn:
+            conn.execute("DELETE FROM files WHERE contract_id = ?", (zip_folder_name,))
+            conn.executemany(
+                f"INSERT INTO files ({', '.join(CATALOG_FILE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(CATALOG_FILE_COLUMNS))})",
+                [row + (run_id,) for row in rows],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO contracts (contract_id, comments, files, run_id) VALUES (?, ?, ?, ?)",
+                (zip_folder_name, comments, len(rows), run_id),
+            )
+            conn.execute(
+                "UPDATE runs SET workspaces = workspaces + 1, files = files + ? WHERE run_id = ?",
+                (len(rows), run_id),
+            )
+        count("catalog_rows", len(rows))
+    except sqlite3.Error as e:
+        logger.warning(f"Could not record {zip_folder_name} in the file catalog: {e}")
+
+def update_catalog_duplicates(dest_path: str, zip_folder_name: str, file_resume):
+    """Refresh the duplicate_of column of a workspace already recorded in this run."""
+    catalog_path = os.path.join(dest_path, dt.catalog_name)
+    if not dt.catalog_enabled or catalog_path not in CATALOG_RUNS:
+        return
+    conn, _ = CATALOG_RUNS[catalog_path]
+    rows = [(catalog_text(duplicate_of), zip_folder_name, os.path.join(zip_folder_name, folder, file))
+            for duplicate_of, folder, file in zip(file_resume["Duplicate Of"], file_resume["Category Folder"],
+                                                  file_resume["File Original Name"])]
+    try:
+        with conn:
+            conn.executemany("UPDATE files SET duplicate_of = ? WHERE contract_id = ? AND final_path = ?", rows)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not update the duplicates of {zip_folder_name} in the file catalog: {e}")
+
+def finish_catalog_run(dest_path: str):
+    """Stamp the end of the current run in the catalog under dest_path and close it."""
+    catalog_path = os.path.join(dest_path, dt.catalog_name)
+    if catalog_path not in CATALOG_RUNS:
+        return
+    conn, run_id = CATALOG_RUNS.pop(catalog_path)
+    try:
+        with conn:
+            conn.execute("UPDATE runs SET finished = ? WHERE run_id = ?",
+                         (datetime.now().isoformat(timespec="seconds"), run_id))
+        logger.info(f"🗂️ File catalog → {catalog_path} (run {run_id})")
+    except sqlite3.Error as e:
+        logger.warning(f"Could not close the file catalog run {run_id}: {e}")
+    finally:
+        conn.close()
+
+
+# Module logger. The console handler is installed by setup_log(), which main() and every
+# worker process call, so importing this module does not configure logging by itself.
+logger = logging.getLogger()
 
 # ================================================================================
 # === STEP 1 : ZIP Files Extraction & and Creation of Contract Id Folders ========
 # ================================================================================
 
+@timed_stage("step_1")
 def step_1(source_path, dest_path):
     try:
         logger.info(f"🔹🔹 Step 1.1: Validating Source and Destination Paths...")
@@ -249,78 +1502,176 @@ def validate_paths(source_path, dest_path):
 # --------------------------------------------------------------------------------
 # --- Step 1.2: Recursive function to traverse folders and extract ZIP files -----
 # --------------------------------------------------------------------------------
-def process_folder(current_folder, dest_base, source_base):
+def process_folder(current_folder, dest_base, source_base, max_workers: int = None):
+    """
+    Find every ZIP below `current_folder` and extract each one into its
+    own folder under `dest_base`, `max_workers` archives at a time
+    (default dt.extract_workers). Returns {zip folder name: file count}
+    in the same order as a serial, folder-by-folder extraction.
+    """
+    try:
+        manifest = load_manifest(dest_base) if dt.incremental_runs else None
+        with track_stage("step_1.discover"):
+            jobs = discover_zip_files(current_folder, dest_base, source_base, manifest)
+        if not jobs:
+            return {}
+        reset_copies()
+
+        workers = max(1, min(max_workers or dt.extract_workers or 1, len(jobs)))
+        counts = {}
+        started = time.perf_counter()
+
+        if workers == 1:
+            for done, job in enumerate(jobs, start=1):
+                counts[job[3]] = extract_zip_job(job)
+                log_progress("Step 1 extraction", done, len(jobs), started)
+        else:
+            logger.info(f"🔹🔹 Extracting {len(jobs)} ZIP files with {workers} threads...")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(extract_zip_job, job): job for job in jobs}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    counts[futures[future][3]] = future.result()
+                    log_progress("Step 1 extraction", done, len(jobs), started)
+
+        zip_summary = {}  # ✅ Dictionary to store {Contract ID: number of files}
+        for file_name, file_path, zip_folder_name, zip_folder in jobs:
+            if counts[zip_folder] != -1:
+                zip_summary[zip_folder_name] = counts[zip_folder]
+                COPIES["workspaces"][os.path.normpath(zip_folder)] = register_copies(zip_folder, zip_folder_name)
+
+                if manifest is not None:
+                    record_manifest_extraction(manifest, file_path, zip_folder_name,
+                                               counts[zip_folder], source_base)
+
+        if manifest is not None:
+            save_manifest(dest_base, manifest)
+
+        return zip_summary  # ✅ Return the summary of extracted ZIP files
+    except Exception as e:
+        logger.error(f"🔹❌ Error processing folder {current_folder}: {e}")
+        logger.error(traceback.format_exc())
+        return {}
+
+def discover_zip_files(current_folder, dest_base, source_base, manifest: dict = None) -> list:
+    """
+    Walk `current_folder` recursively (files first, then subfolders) and
+    return one (file_name, file_path, zip_folder_name, zip_folder) job per
+    ZIP that has not been extracted yet. The source tree is mirrored under
+    `dest_base` as the jobs are extracted (extract_zip_job creates each
+    zip_folder with its parents), so subfolders without a queued ZIP leave
+    no folder behind.
+
+    With a `manifest`, an extracted archive is skipped only while its
+    content and the rules are unchanged; otherwise its folder is removed
+    and it is extracted again.
+    """
     try:
         relative_path = os.path.relpath(current_folder, source_base)
         new_dest = os.path.join(dest_base, relative_path)
-        os.makedirs(new_dest, exist_ok=True)
 
-        zip_summary = {}  # ✅ Dictionary to store {Contract ID: number of files}
+        jobs = []
+        sub_folders = []
+
+        # Single directory scan: the entry type comes from the listing itself
+        with os.scandir(current_folder) as entries:
+            entries = list(entries)
 
         # Process files
-        for file_name in os.listdir(current_folder):
-            file_path = os.path.join(current_folder, file_name)
+        for entry in entries:
+            file_name, file_path = entry.name, entry.path
 
-            if os.path.isfile(file_path) and file_name.lower().endswith('.zip'):
+            if entry.is_dir():
+                sub_folders.append(file_path)
+            elif entry.is_file() and file_name.lower().endswith('.zip'):
                 zip_folder_name = os.path.splitext(file_name)[0]
                 zip_folder = os.path.join(new_dest, zip_folder_name)
+                previous = manifest.get(os.path.relpath(file_path, source_base)) if manifest else None
+
+                if os.path.exists(zip_folder) and previous is not None:
+                    if archive_unchanged(previous, archive_fingerprint(file_path, previous)):
+                        logger.warning(f"🔹🔹 Skipping ZIP (unchanged since last run): {file_name}")
+                        continue
+                    logger.info(f"🔹🔄 Reprocessing changed ZIP: {file_name}")
+                    shutil.rmtree(zip_folder)
 
                 if os.path.exists(zip_folder):
                     logger.warning(f"🔹🔹 Skipping ZIP (already extracted): {file_name}")
                 else:
-                    os.makedirs(zip_folder, exist_ok=True)
-                    file_count = extract_zip_files(file_path, zip_folder)
-
-                    if file_count != -1:
-                        logger.info(f"🔹📦 Extracted {file_count} files from {os.path.basename(file_name)}")
-                        zip_summary[zip_folder_name] = file_count
+                    jobs.append((file_name, file_path, zip_folder_name, zip_folder))
 
         # Process subfolders recursively
-        for sub_folder in os.listdir(current_folder):
-            sub_folder_path = os.path.join(current_folder, sub_folder)
-            if os.path.isdir(sub_folder_path):
-                sub_summary = process_folder(sub_folder_path, dest_base, source_base)
-                zip_summary.update(sub_summary)
+        for sub_folder_path in sub_folders:
+            jobs.extend(discover_zip_files(sub_folder_path, dest_base, source_base, manifest))
 
-        return zip_summary  # ✅ Return the summary of extracted ZIP files
+        return jobs
     except Exception as e:
         logger.error(f"🔹❌ Error processing folder {current_folder}: {e}")
         logger.error(traceback.format_exc())
-        return {}
+        return []
+
+@timed_stage("step_1.extract_zip")
+def extract_zip_job(job) -> int:
+    """Extract one job from discover_zip_files. Returns the file count or -1."""
+    file_name, file_path, _, zip_folder = job
+    os.makedirs(zip_folder, exist_ok=True)
+    hashes = {}
+    file_count = extract_zip_files(file_path, zip_folder, hashes)
+    with _copies_lock:
+        COPIES["hashes"][zip_folder] = hashes
+
+    if file_count != -1:
+        logger.info(f"🔹📦 Extracted {file_count} files from {os.path.basename(file_name)}")
+        count("zip_archives")
+        count("zip_bytes", os.path.getsize(file_path))
+        count("files_extracted", file_count)
+    return file_count
 
 # --------------------------------------------------------------------------------
 # --- Step 1.2.1: Extract ZIP files and handle nested ZIPs -----------------------
 # --------------------------------------------------------------------------------
-def extract_zip_files(zip_path, extract_to):
-    file_count = 0
+COPY_CHUNK_SIZE  = 1 << 20      # Bytes copied per read when streaming ZIP members
+NESTED_ZIP_SPOOL = 64 << 20     # Nested ZIPs up to this size are buffered in memory, larger ones go to a temp file
+_WINDOWS_ILLEGAL = str.maketrans(':<>|"?*', "_" * 7)
+
+def spool_nested_zip(src, size: int):
+    """
+    Copy a nested ZIP member of `size` bytes into a seekable buffer that
+    zipfile can open: in memory up to NESTED_ZIP_SPOOL, a temporary file
+    beyond that (SpooledTemporaryFile is only seekable() from Python 3.11).
+    """
+    buffer = io.BytesIO() if size <= NESTED_ZIP_SPOOL else tempfile.TemporaryFile()
+    shutil.copyfileobj(src, buffer, COPY_CHUNK_SIZE)
+    buffer.seek(0)
+    return buffer
+
+def zip_member_name(info: zipfile.ZipInfo) -> str:
+    """
+    Flattened file name a ZIP member is extracted to: the last path
+    component, sanitized the same way ZipFile.extractall does on Windows.
+    """
+    name = info.filename.replace("/", os.sep)
+    if os.altsep:
+        name = name.replace(os.altsep, os.sep)
+    name = name.split(os.sep)[-1]
+    if os.name == "nt":
+        name = name.translate(_WINDOWS_ILLEGAL).rstrip(".")
+    return "" if name in (".", "..") else name
+
+def extract_zip_files(zip_path, extract_to, hashes: dict = None):
+    """
+    Extract every file of `zip_path` (and of any nested ZIP) straight into
+    `extract_to`, dropping the archive's folder structure. Returns the
+    number of files extracted, or -1 when the archive cannot be read.
+    The SHA-256 of each extracted file is added to `hashes` ({file name:
+    hex digest}) when given.
+    """
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             if not zip_ref.namelist():
                 logger.warning(f"🔹⚠️ ZIP is empty: {os.path.basename(zip_path)}")
-                return file_count
-
-            temp_extract_path = os.path.join(extract_to, "Temporal Folder")
-            os.makedirs(temp_extract_path, exist_ok=True)
-
-            zip_ref.extractall(temp_extract_path)
-
-            # Move extracted files
-            for root, _, files in os.walk(temp_extract_path):
-                for file in files:
-                    file_count += 1
-                    src_file = os.path.join(root, file)
-                    dest_file = os.path.join(extract_to, file)
+                return 0
 
-                    try:
-                        shutil.move(src_file, dest_file)
-                    except FileExistsError:
-                        os.remove(dest_file)
-                        shutil.move(src_file, dest_file)
-
-                    if file.lower().endswith('.zip'):
-                        file_count += extract_zip_files(dest_file, extract_to)
-
-            shutil.rmtree(temp_extract_path, ignore_errors=True)
+            return extract_zip_members(zip_ref, extract_to, {} if hashes is None else hashes)
 
     except zipfile.BadZipFile:
         logger.error(f"🔹❌ Bad ZIP file: {zip_path}")
@@ -330,94 +1681,315 @@ def extract_zip_files(zip_path, extract_to):
         logger.error(traceback.format_exc())
         return -1
 
+def extract_zip_members(zip_ref: zipfile.ZipFile, extract_to: str, hashes: dict) -> int:
+    """
+    Stream each member of an open archive to its flattened path in
+    `extract_to`, hashing it in the same pass (see extract_member). A later
+    member with the same name overwrites an earlier one. Nested ZIPs are
+    read from the parent archive (through spool_nested_zip when
+    compressed) and never written to disk; they still count as one file,
+    plus their own contents. A nested ZIP that cannot be read is logged
+    and skipped without failing the outer archive.
+    """
+    file_count = 0
+    for info in zip_ref.infolist():
+        file_name = zip_member_name(info)
+        if info.is_dir() or not file_name:
+            continue
+        file_count += 1
+
+        if not file_name.lower().endswith('.zip'):
+            hashes[file_name] = extract_member(zip_ref, info, os.path.join(extract_to, file_name))
+            continue
+
+        try:
+            with zip_ref.open(info) as src:
+                if info.compress_type == zipfile.ZIP_STORED:
+                    nested_count = extract_nested_zip(src, file_name, extract_to, hashes)
+                else:
+                    with spool_nested_zip(src, info.file_size) as buffer:
+                        nested_count = extract_nested_zip(buffer, file_name, extract_to, hashes)
+        except Exception as e:
+            logger.error(f"🔹❌ Error extracting nested ZIP, skipped: {file_name}: {e}")
+            logger.error(traceback.format_exc())
+            file_count -= 1
+            continue
+        if nested_count != -1:
+            file_count += nested_count
+
     return file_count
 
+def extract_nested_zip(buffer, file_name: str, extract_to: str, hashes: dict) -> int:
+    """
+    Extract a nested ZIP from a seekable buffer. An unreadable nested ZIP
+    is kept as a regular file so no content is lost. Returns the number
+    of files extracted, or -1 when the buffer is not a valid ZIP.
+    """
+    try:
+        with zipfile.ZipFile(buffer) as nested:
+            return extract_zip_members(nested, extract_to, hashes)
+    except zipfile.BadZipFile:
+        logger.error(f"🔹❌ Bad nested ZIP file, kept as is: {file_name}")
+        buffer.seek(0)
+        hashes[file_name] = write_copy(buffer, os.path.join(extract_to, file_name))
+        return -1
+
+# --------------------------------------------------------------------------------
+# --- Step 1.2.2: Content hashes and duplicate copies ----------------------------
+# --------------------------------------------------------------------------------
+_copies_lock = threading.Lock()
+
+def new_copy_registry() -> dict:
+    """
+    Run-wide view of extracted content:
+      hashes     – {workspace folder: {file: sha256}} as extracted, until register_copies
+      first      – {sha256: "Contract Id/file"} of the first copy of each content
+      workspaces – {workspace folder: register_copies result}, until run_step_2 takes it
+      by_crc     – {(CRC-32, size): [path]} of written files, to find hardlink candidates
+      paths      – {path: sha256} of written files
+    """
+    return {"hashes": {}, "first": {}, "workspaces": {}, "by_crc": {}, "paths": {}}
+
+COPIES = new_copy_registry()   # Extraction runs in this process (threads), so one registry per run
+
+def reset_copies():
+    with _copies_lock:
+        COPIES.clear()
+        COPIES.update(new_copy_registry())
+
+def write_copy(src, dst_path: str) -> str:
+    """Stream `src` to `dst_path` and return the SHA-256 of what was written."""
+    if dt.dedupe_hardlinks and os.path.lexists(dst_path):
+        os.remove(dst_path)   # Never write through a hardlink shared with another copy
+
+    digest = hashlib.sha256()
+    with open(dst_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+    return digest.hexdigest()
+
+def extract_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, dst_path: str) -> str:
+    """
+    Extract one member to `dst_path` and return its SHA-256, computed while
+    the bytes are copied. With dt.dedupe_hardlinks, a member whose CRC and
+    size match an earlier copy of this run is hashed first and, when the
+    content is the same, hard-linked to that copy instead of written.
+    """
+    key = (info.CRC, info.file_size)
+    if dt.dedupe_hardlinks:
+        with _copies_lock:
+            candidates = [path for path in COPIES["by_crc"].get(key, ()) if path != dst_path]
+        if candidates:
+            digest = hashlib.sha256()
+            with zip_ref.open(info) as src:
+                for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+            for path in candidates:
+                if COPIES["paths"].get(path) != content_hash:
+                    continue
+                try:
+                    if os.path.lexists(dst_path):
+                        os.remove(dst_path)
+                    os.link(path, dst_path)
+                    count("files_hardlinked")
+                    return content_hash
+                except OSError as e:   # Moved already, or no hardlinks on this filesystem
+                    logger.debug(f"Could not hard-link '{os.path.basename(dst_path)}': {e}")
+                break
+
+    with zip_ref.open(info) as src:
+        content_hash = write_copy(src, dst_path)
+
+    if dt.dedupe_hardlinks:
+        with _copies_lock:
+            COPIES["by_crc"].setdefault(key, []).append(dst_path)
+            COPIES["paths"][dst_path] = content_hash
+    return content_hash
+
+def register_copies(zip_folder: str, zip_folder_name: str) -> dict:
+    """
+    Match the files just extracted into `zip_folder` against every copy
+    extracted before in this run. Call it once per workspace, in job order,
+    from the main thread. Returns {file: (sha256, "Contract Id/file" of the
+    first copy, or "" for the first copy itself)}; resolve_duplicate_paths
+    turns the first copy's name into its final path once it is placed.
+    """
+    with _copies_lock:
+        hashes = COPIES["hashes"].pop(zip_folder, {})
+        copies = {}
+        for file, content_hash in hashes.items():
+            here = f"{zip_folder_name}/{file}"
+            first = COPIES["first"].setdefault(content_hash, here)
+            copies[file] = (content_hash, "" if first == here else first)
+
+    duplicates = sum(1 for _, duplicate_of in copies.values() if duplicate_of)
+    if duplicates:
+        logger.debug(f"🔹🔁 {duplicates} files of {zip_folder_name} were already extracted in this run")
+        count("duplicate_files", duplicates)
+    return copies
+
 # ================================================================================
 # === STEP 2 : Classify files, build summaries and trim long names ===============
 # ================================================================================
 
-def step_2(extract_to: str, zip_folder_name: str):
+FILE_RESUME_COLUMNS = (
+    "Category Folder",
+    "Contract Id",
+    "Supplier Name",
+    "File Category",
+    "Amendment Number",
+    "Extracted Date",
+    "File Extension",
+    "File Original Name",
+    "Content Hash",
+    "Duplicate Of",
+)
+CONTRACT_RESUME_COLUMNS = ("Contract_id", "Carlos Comments")
+
+# File categories that satisfy each required document; a workspace without any of them is
+# reported as "Missing <name>" in contract_resume (and by catalog.py missing)
+REQUIRED_DOCUMENTS = {
+    "BSA": {"BSA", "MSA","SSA", "POTAC", "SaaS","SLA","MCA","GBA", "LIA"},
+}
+
+class FileRecord:
+    """
+    One row of file_resume. Rows are collected as compact slotted records
+    and turned into a DataFrame once per workspace, instead of growing the
+    DataFrame row by row.
+    """
+    __slots__ = (
+        "category_folder",
+        "contract_id",
+        "supplier_name",
+        "file_category",
+        "amendment_number",
+        "extracted_date",
+        "file_extension",
+        "file_original_name",
+        "content_hash",
+        "duplicate_of",
+    )
+
+    def __init__(self, category_folder="", contract_id="", supplier_name="", file_category="",
+                 amendment_number="", extracted_date="", file_extension="", file_original_name="",
+                 content_hash="", duplicate_of=""):
+        self.category_folder    = category_folder
+        self.contract_id        = contract_id
+        self.supplier_name      = supplier_name
+        self.file_category      = file_category
+        self.amendment_number   = amendment_number
+        self.extracted_date     = extracted_date
+        self.file_extension     = file_extension
+        self.file_original_name = file_original_name
+        self.content_hash       = content_hash
+        self.duplicate_of       = duplicate_of
+
+    def as_row(self) -> tuple:
+        """Values in FILE_RESUME_COLUMNS order."""
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+
+def build_file_records(zip_folder_name: str, categorized_files: list, copies: dict = None) -> list:
+    """
+    One FileRecord per classified file (the first result of a file wins),
+    with its content hash and first copy from `copies` when known.
     """
-    1. Create category folders
-    2. Initial PDF / other split
-    3. Classify files (PDF text + filename heuristics)
-    4. Build file_resume and contract_resume
-    5. Trim long filenames
+    copies = copies or {}
+    records: list = []          # FileRecord per file, turned into file_resume once
+    seen_keys = set()
+
+    for info in categorized_files:
+        file_key = info["file"]
+        if file_key in seen_keys:        # avoid duplicates
+            continue
+        seen_keys.add(file_key)
+        content_hash, duplicate_of = copies.get(file_key, ("", ""))
+
+        records.append(FileRecord(
+            category_folder    = info.get("category", ""),
+            contract_id        = zip_folder_name,
+            supplier_name      = info.get("supplier", ""),
+            file_category      = info.get("subcategory", ""),
+            amendment_number   = info.get("amendment_number", ""),
+            extracted_date     = info.get("date", ""),
+            file_extension     = os.path.splitext(file_key)[-1].lower(),
+            file_original_name = file_key,
+            content_hash       = content_hash,
+            duplicate_of       = duplicate_of,
+        ))
+    return records
+
+def missing_documents(records: list) -> list:
+    """Sorted REQUIRED_DOCUMENTS names none of whose file categories appear in `records`."""
+    present = {record.file_category.strip().upper() for record in records}
+    missing_docs = []
+    for canon_name, aliases in REQUIRED_DOCUMENTS.items():
+        if not {a.upper() for a in aliases} & present:
+            missing_docs.append(canon_name)
+    return sorted(missing_docs)
+
+
+@timed_stage("step_2.workspace")
+def step_2(extract_to: str, zip_folder_name: str, copies: dict = None):
+    """
+    1. List the extracted files (they stay in place until step 5)
+    2. Classify files (PDF text + filename heuristics)
+    3. Build file_resume and contract_resume
+    4. Plan trimmed final names
+    5. Move every file to its final folder and name, once; category
+       folders are created when their first file arrives
     6. Export CSV summaries
+
+    `copies` is register_copies' result for this workspace (content hash
+    and first copy of each file); without it those columns stay empty.
     """
+    import pandas as pd # This module provides data structures and data analysis tools, particularly for working with tabular data
+
+    copies = copies or {}
     try:
         # ------------------------------------------------------- 1
-        create_category_folders(extract_to, zip_folder_name)
+        files = workspace_files(os.path.join(extract_to, zip_folder_name))
 
         # ------------------------------------------------------- 2
-        initial_preclassification(extract_to, zip_folder_name)
+        contract_rows: list = []
 
         # ------------------------------------------------------- 3
-        file_resume = pd.DataFrame(columns=[
-            "Category Folder",
-            "Contract Id",
-            "Supplier Name",
-            "File Category",
-            "Amendment Number",
-            "Extracted Date",
-            "File Extension",
-            "File Original Name",
-        ])
-        contract_resume = pd.DataFrame(columns=["Contract_id", "Carlos Comments"])
-
-        # ------------------------------------------------------- 4
         logger.info(f"📁 File classification starting for {zip_folder_name}")
+        pdf_files = ([] if dt.classification_mode == "filename"
+                     else assign_file_category_pdf(extract_to, zip_folder_name, files,
+                                                   {file: copy[0] for file, copy in copies.items()}))
+        matched = {info["file"] for info in pdf_files}
         categorized_files = (
             
-            assign_file_category_pdf(extract_to, zip_folder_name) +
-            assign_file_category_filename(extract_to, zip_folder_name)
+            pdf_files +
+            assign_file_category_filename(extract_to, zip_folder_name,
+                                          [file for file in files if file not in matched])
         )
+        records = build_file_records(zip_folder_name, categorized_files, copies)
 
- 
-        seen_keys = set()
-
-        for info in categorized_files:
-            file_key = info["file"]
-            if file_key in seen_keys:        # avoid duplicates
-                continue
-            seen_keys.add(file_key)
-
-            file_resume.loc[len(file_resume)] = {
-                "Category Folder" : info.get("category", ""),
-                "Contract Id"     : zip_folder_name,
-                "Supplier Name"   : info.get("supplier", ""),
-                "File Category"   : info.get("subcategory", ""),
-                "Amendment Number": info.get("amendment_number", ""),
-                "Extracted Date"  : info.get("date", ""),
-                "File Extension"  : os.path.splitext(file_key)[-1].lower(),
-                "File Original Name": file_key,
-            }
- 
-
-        # ------------------------------------------------------- 5
-        required_groups = {
-            "BSA": {"BSA", "MSA","SSA", "POTAC", "SaaS","SLA","MCA","GBA", "LIA"}, 
-        } 
-        present = {cat.strip().upper() for cat in file_resume["File Category"]} 
-        missing_docs = []
-        for canon_name, aliases in required_groups.items():
-            if not {a.upper() for a in aliases} & present:               
-                missing_docs.append(canon_name) 
+        # ------------------------------------------------------- 4
+        missing_docs = missing_documents(records)
         if missing_docs:
-            contract_resume.loc[len(contract_resume)] = {
-                "Contract_id": zip_folder_name,
-                "Carlos Comments": "Missing " + " ".join(sorted(missing_docs)),
-            } 
+            contract_rows.append((zip_folder_name, "Missing " + " ".join(missing_docs)))
 
-        # ------------------------------------------------------- 6
-        file_resume = trim_long_filenames(
-            file_resume=file_resume,
+        # ------------------------------------------------------- 5
+        sources = [record.file_original_name for record in records]
+        records = trim_long_filenames(
+            records=records,
             extract_to=extract_to,
             zip_folder_name=zip_folder_name,
             logger=logger,
         )
+        place_files(extract_to, zip_folder_name, sources, records)
+        count("workspaces")
+        count("files_classified", len(records))
+        file_resume     = pd.DataFrame([record.as_row() for record in records], columns=FILE_RESUME_COLUMNS)
+        contract_resume = pd.DataFrame(contract_rows, columns=CONTRACT_RESUME_COLUMNS)
 
-        # ------------------------------------------------------- 7
+        # ------------------------------------------------------- 6
         output_folder = os.path.join(extract_to, zip_folder_name)
         file_resume.to_csv(os.path.join(output_folder, "file_resume.csv"), index=False)
         contract_resume.to_csv(os.path.join(output_folder, "contract_resume.csv"), index=False)
@@ -430,78 +2002,266 @@ def step_2(extract_to: str, zip_folder_name: str):
 
 
 # --------------------------------------------------------------------------------
-# --- Step: 2.1: Create category folders for each CW folder ----------------------
+# --- Step: 2.0  Run Step 2 for every contract workspace (optionally in parallel) -
 # --------------------------------------------------------------------------------
-def create_category_folders(extract_to: str, zip_folder_name: str):
+@timed_stage("step_2")
+def run_step_2(extract_to: str, zip_folder_names, max_workers: int = None) -> dict:
+    """
+    Run step_2 for every contract workspace in `zip_folder_names`.
+
+    Workspaces are independent, so they are fanned out to a pool of
+    `max_workers` processes (None → one per CPU core). With a single
+    worker, or a single workspace, everything runs in this process.
+    Returns {zip_folder_name: (file_resume, contract_resume)} in the
+    same order as `zip_folder_names`.
     """
-    Build a folder for each category defined in dt.folder_categories
-    plus a default 'Uncategorized' folder.
+    zip_folder_names = list(zip_folder_names)
+    workers = max_workers or os.cpu_count() or 1
+    workers = min(workers, len(zip_folder_names)) or 1
+    results = {}
+    started = time.perf_counter()
+
+    copies = {name: COPIES["workspaces"].pop(os.path.normpath(os.path.join(extract_to, name)), None)
+              for name in zip_folder_names}
+
+    if workers == 1:
+        for done, zip_folder_name in enumerate(zip_folder_names, start=1):
+            results[zip_folder_name] = step_2(extract_to, zip_folder_name, copies[zip_folder_name])
+            record_catalog(extract_to, zip_folder_name, results[zip_folder_name])
+            log_progress("Step 2 workspaces", done, len(zip_folder_names), started)
+        resolve_duplicate_paths(extract_to, results)
+        return results
+
+    logger.info(f"🔹🔹 Classifying {len(zip_folder_names)} contract workspaces with {workers} workers...")
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=worker_initargs()) as pool:
+        futures = {pool.submit(step_2_task, extract_to, name, copies[name]): name for name in zip_folder_names}
+        for done, future in enumerate(as_completed(futures), start=1):
+            zip_folder_name = futures[future]
+            results[zip_folder_name] = step_2_result(future, zip_folder_name)
+            record_catalog(extract_to, zip_folder_name, results[zip_folder_name])
+            logger.debug(f"🔹✅ [{done}/{len(futures)}] Workspace classified: {zip_folder_name}")
+            log_progress("Step 2 workspaces", done, len(futures), started)
+
+    results = {name: results[name] for name in zip_folder_names}
+    resolve_duplicate_paths(extract_to, results)
+    return results
+
+def step_2_task(extract_to: str, zip_folder_name: str, copies: dict = None) -> tuple:
     """
+    step_2 as run inside a worker process. Returns (step_2 result, metrics)
+    so the worker's timings and counters reach the main process, and
+    profiles the workspace when dt.profile_enabled.
+    """
+    take_metrics()   # Start from a clean slate in this worker
+    profiler = start_profiler()
     try:
-        zip_folder_path = os.path.join(extract_to, zip_folder_name)
-        if not os.path.exists(zip_folder_path):
-            logger.error(f"ZIP folder path not found: {zip_folder_path}")
-            return
-
-        # Create main category folders
-        for category in dt.folder_categories:
-            category_path = os.path.join(zip_folder_path, category)
-            os.makedirs(category_path, exist_ok=True)
+        result = step_2(extract_to, zip_folder_name, copies)
+    finally:
+        stop_profiler(profiler, extract_to, f"step_2_{zip_folder_name}")
+    return result, take_metrics()
 
-        # Create 'Uncategorized'
-        os.makedirs(os.path.join(zip_folder_path, "Uncategorized"), exist_ok=True)
+def step_2_result(future, zip_folder_name: str) -> tuple:
+    """Result of a step_2_task future, or empty frames when its worker failed."""
+    import pandas as pd # This module provides data structures and data analysis tools, particularly for working with tabular data
 
+    try:
+        result, metrics = future.result()
+        merge_metrics(metrics)
+        return result
     except Exception as e:
-        logger.error(f"Error creating category folders: {e}")
+        logger.error(f"❌ Worker failed on {zip_folder_name}: {e}")
         logger.error(traceback.format_exc())
+        return pd.DataFrame(), pd.DataFrame()
+
+def resolve_duplicate_paths(extract_to: str, results: dict):
+    """
+    Once every workspace of `results` ({zip_folder_name: (file_resume,
+    contract_resume)}) is placed, point "Duplicate Of" at the final path of
+    the first copy (<workspace>/<category folder>/<final name>) instead of
+    the name it was extracted under, and rewrite the file_resume.csv and
+    catalog rows of the workspaces that changed. A first copy whose
+    workspace failed keeps its extraction path, where it still is.
+    """
+    placed = {}   # {content hash: final path of the first copy}
+    for zip_folder_name, (file_resume, _) in results.items():
+        if not len(file_resume.columns):
+            continue
+        for content_hash, duplicate_of, folder, file in zip(
+            file_resume["Content Hash"], file_resume["Duplicate Of"],
+            file_resume["Category Folder"], file_resume["File Original Name"],
+        ):
+            if content_hash and not duplicate_of:
+                placed.setdefault(content_hash, os.path.join(zip_folder_name, folder, file))
+
+    for zip_folder_name, (file_resume, _) in results.items():
+        if not len(file_resume.columns):
+            continue
+        old = list(file_resume["Duplicate Of"])
+        new = [placed.get(content_hash, duplicate_of) if duplicate_of else duplicate_of
+               for content_hash, duplicate_of in zip(file_resume["Content Hash"], old)]
+        if new == old:
+            continue
+        file_resume["Duplicate Of"] = new
+        try:
+            file_resume.to_csv(os.path.join(extract_to, zip_folder_name, "file_resume.csv"), index=False)
+        except OSError as e:
+            logger.error(f"❌ Could not update the duplicates of {zip_folder_name}: {e}")
+        update_catalog_duplicates(extract_to, zip_folder_name, file_resume)
 
 
 # --------------------------------------------------------------------------------
-# --- Step: 2.1.1  Initial pre-classification (PDF to Supporting, others to Uncategorized)
+# --- Steps 1-2 pipelined: classify each workspace as soon as it is extracted ------
 # --------------------------------------------------------------------------------
-def initial_preclassification(extract_to: str, zip_folder_name: str):
+@timed_stage("steps_1_2")
+def run_pipeline(source_path: str, dest_path: str, extract_workers: int = None,
+                 classify_workers: int = None, queue_size: int = None) -> tuple:
     """
-    Move PDFs and MSGs to 'Supporting Documents' and everything else
-    to 'Uncategorized'. Keeps original filenames intact.
+    Overlap Step 1 and Step 2. Extraction threads push every finished
+    workspace onto a bounded queue and step_2 workers classify it right
+    away. When the queue is full, extraction waits (back-pressure), so
+    extracted-but-unclassified workspaces never pile up on disk.
+
+    Returns (zip_summary, results) like step_1 and run_step_2.
     """
+    if not validate_paths(source_path, dest_path):
+        logger.critical("❌ Pipeline failed: Invalid source or destination path.")
+        return {}, {}
+
+    manifest = load_manifest(dest_path) if dt.incremental_runs else None
+    with track_stage("step_1.discover"):
+        jobs = discover_zip_files(source_path, dest_path, source_path, manifest)
+    if not jobs:
+        return {}, {}
+    reset_copies()
+
+    extract_workers  = max(1, min(extract_workers or dt.extract_workers or 1, len(jobs)))
+    classify_workers = max(1, min(classify_workers or dt.max_workers or os.cpu_count() or 1, len(jobs)))
+    ready = queue.Queue(maxsize=queue_size or dt.pipeline_queue_size or classify_workers)
+    done_marker = object()
+    # Workspaces reach Step 2 in discovery order whatever order extraction finishes in,
+    # so register_copies names the same first copy as a serial run. A finished job waits
+    # for its turn before it is queued, so the bounded queue stays the only buffer.
+    turn = threading.Condition()
+    next_turn = 0
+
+    def extract_and_push(item):
+        nonlocal next_turn
+        index, job = item
+        try:
+            file_count = extract_zip_job(job)
+        except Exception as e:
+            logger.error(f"🔹❌ Error extracting {job[0]}: {e}")
+            file_count = -1
+        with turn:
+            turn.wait_for(lambda: next_turn == index)
+        try:
+            ready.put((index, job, file_count))   # Blocks while the queue is full
+        finally:
+            with turn:
+                next_turn += 1
+                turn.notify_all()
+
+    def producer():
+        with ThreadPoolExecutor(max_workers=extract_workers) as pool:
+            list(pool.map(extract_and_push, enumerate(jobs)))
+        ready.put(done_marker)
+
+    logger.info(f"🔹🔹 Pipelining {len(jobs)} ZIP files: {extract_workers} extraction threads, "
+                f"{classify_workers} classification workers")
+    producer_thread = threading.Thread(target=producer, name="zip-extraction", daemon=True)
+    producer_thread.start()
+
+    counts, results, pending = {}, {}, {}
+    started = time.perf_counter()
+
+    def collect(future, zip_folder_name):
+        results[zip_folder_name] = step_2_result(future, zip_folder_name)
+        record_catalog(dest_path, zip_folder_name, results[zip_folder_name])
+        log_progress("Steps 1-2 workspaces", len(results), len(jobs), started)
+
+    pool = (ProcessPoolExecutor(max_workers=classify_workers, initializer=init_worker, initargs=worker_initargs())
+            if classify_workers > 1 else None)
     try:
-        zip_folder_path = os.path.join(extract_to, zip_folder_name)
-        if not os.path.exists(zip_folder_path):
-            logger.error(f"ZIP folder path not found: {zip_folder_path}")
-            return
+        while True:
+            item = ready.get()
+            if item is done_marker:
+                break
+            index, (file_name, file_path, zip_folder_name, zip_folder), file_count = item
+            counts[index] = file_count
+            if file_count == -1:
+                continue
+            if manifest is not None:
+                record_manifest_extraction(manifest, file_path, zip_folder_name, file_count, source_path)
+            copies = register_copies(zip_folder, zip_folder_name)
+
+            if pool is None:
+                results[zip_folder_name] = step_2(dest_path, zip_folder_name, copies)
+                record_catalog(dest_path, zip_folder_name, results[zip_folder_name])
+                log_progress("Steps 1-2 workspaces", len(results), len(jobs), started)
+                continue
 
-        supporting = os.path.join(zip_folder_path, "Supporting Documents")
-        uncategorized = os.path.join(zip_folder_path, "Uncategorized")
-        os.makedirs(supporting, exist_ok=True)
-        os.makedirs(uncategorized, exist_ok=True)
+            # Keep at most one queued task per worker so back-pressure reaches extraction
+            while len(pending) >= classify_workers:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future, pending.pop(future))
+            pending[pool.submit(step_2_task, dest_path, zip_folder_name, copies)] = zip_folder_name
+
+        for future in as_completed(pending):
+            collect(future, pending[future])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        # Unblock the extraction threads if classification stopped early
+        while producer_thread.is_alive():
+            try:
+                ready.get(timeout=1)
+            except queue.Empty:
+                pass
+        producer_thread.join()
 
-        for file in os.listdir(zip_folder_path):
-            file_path = os.path.join(zip_folder_path, file)
-            if not os.path.isfile(file_path):
-                continue
+    zip_summary = {}
+    for index, (_, _, zip_folder_name, _) in enumerate(jobs):
+        if counts.get(index, -1) != -1:
+            zip_summary[zip_folder_name] = counts[index]
 
-            ext = os.path.splitext(file)[-1].lower()
-            dest = supporting if ext in (".pdf", ".msg") else uncategorized
+    if manifest is not None:
+        save_manifest(dest_path, manifest)
 
-            try:
-                shutil.move(file_path, os.path.join(dest, file))
-            except Exception as e:
-                logger.error(f"Error moving '{file}' → '{dest}': {e}")
+    results = {name: results[name] for name in zip_summary if name in results}
+    resolve_duplicate_paths(dest_path, results)
+    return zip_summary, results
 
-    except Exception as e:
-        logger.error(f"❌ Error during initial pre-classification: {e}")
-        logger.error(traceback.format_exc())
+
+# --------------------------------------------------------------------------------
+# --- Step: 2.1  List the extracted files of a CW folder -------------------------
+# --------------------------------------------------------------------------------
+def workspace_files(zip_folder_path: str) -> list:
+    """
+    Names of the files extracted into the root of a contract workspace.
+    They are classified where they are and moved once, by place_files,
+    after their final folder and name are known.
+    """
+    if not os.path.exists(zip_folder_path):
+        logger.error(f"ZIP folder path not found: {zip_folder_path}")
+        return []
+
+    with os.scandir(zip_folder_path) as entries:
+        return [entry.name for entry in entries if entry.is_file()]
 
 
 # # --------------------------------------------------------------------------------
 # --- Step: 2.2  Classification using PDF text -------------------------------------
 # # --------------------------------------------------------------------------------
-def assign_file_category_pdf(extract_to: str, zip_folder_name: str) -> list:
+@timed_stage("step_2.pdf_classification")
+def assign_file_category_pdf(extract_to: str, zip_folder_name: str, files: list,
+                             hashes: dict = None) -> list:
     """
-    Read PDF text with pdfplumber, classify according to dt.folder_categories,
-    extract any anchor-defined date, and trailing number (for *any* category
-    that defines 'trailing_number_extraction').
-    Returns a list of metadata dicts.
+    Classify every PDF among `files` (names in the CW folder root) with
+    classify_pdf_file. Files are not moved here. A PDF whose content hash
+    (from `hashes`, {file: sha256}) was classified before in this process
+    reuses that result instead of being parsed again.
+    Returns a list of metadata dicts for the matched PDFs.
     """
     categorized: list = []
 
@@ -510,69 +2270,28 @@ def assign_file_category_pdf(extract_to: str, zip_folder_name: str) -> list:
         logging.getLogger("pdfplumber").setLevel(logging.WARNING)
         logging.getLogger("pdfminer").setLevel(logging.WARNING)
 
-        supporting_folder = os.path.join(extract_to,
-                                         zip_folder_name,
-                                         "Supporting Documents")
-        if not os.path.exists(supporting_folder):
-            logger.warning(f"Supporting Documents folder not found: {supporting_folder}")
-            return []
+        zip_folder_path = os.path.join(extract_to, zip_folder_name)
+        cache_path = (os.path.join(extract_to, dt.text_cache_name)
+                      if dt.text_cache_enabled else None)
+        backend = dt.pdf_backend
+        get_pdf_backend(backend)   # Fail once here on an unknown backend, not once per file
 
-        # ---------- Iterate every PDF in Supporting Documents -------
-        for file in os.listdir(supporting_folder):
+        # ---------- Iterate every PDF of the CW folder -------------
+        for file in files:
             if not file.lower().endswith(".pdf"):
                 continue
 
-            file_path = os.path.join(supporting_folder, file)
+            file_path = os.path.join(zip_folder_path, file)
             try:
-                with pdfplumber.open(file_path) as pdf:
-                    full_text = " ".join(page.extract_text() or ""
-                                         for page in pdf.pages)
+                info = classify_pdf_copy(file_path, cache_path, backend, (hashes or {}).get(file))
             except Exception as e:
                 logger.warning(f"Could not open PDF '{file}': {e}")
                 continue
+            if info is None:
+                continue
 
-            # ---------- Run rules against each category --------------
-            matched = False
-            for folder_category, subcats in dt.folder_categories.items():
-                for file_category, rules in subcats.items():
-                    terms          = rules.get("file_category_extraction", [])
-                    date_terms     = rules.get("date_extraction", [])
-                    trailing_terms = rules.get("trailing_number_extraction", [])
-                    country_patterns = rules.get("country_extraction", [])
-
-                    # Check if any keyword matches the PDF text
-                    if any(term.lower() in full_text.lower() for term in terms):
-                        # --- Date extraction -----------------------------
-                        extracted_date = extract_date(full_text, date_terms)
-
-                        # --- Trailing number extraction ---
-                        trailing_number = ""
-
-                        if file_category == "LIA":
-                            trailing_number = extract_lia_country(full_text, patterns=country_patterns, filename=file)
-                        else: 
-                            trailing_number = extract_trailing_number(full_text, trailing_terms)
- 
-                        # --- Move PDF to final category folder ---
-                        dest_dir = os.path.join(extract_to, zip_folder_name,
-                                                folder_category)
-                        os.makedirs(dest_dir, exist_ok=True)
-                        shutil.move(file_path, os.path.join(dest_dir, file))
-                        logger.debug(f"Moved '{file}' → '{folder_category}' [{file_category}]")
-
-                        # --- Append metadata ---
-                        categorized.append({
-                            "file"            : file,
-                            "category"        : folder_category,
-                            "subcategory"     : file_category,
-                            "date"            : extracted_date or "", 
-                            "amendment_number": trailing_number.strip()
-                        })
- 
-                        matched = True
-                        break  # exit subcat loop
-                if matched:
-                    break      # exit folder_category loop
+            logger.debug(f"Classified '{file}' → '{info['category']}' [{info['subcategory']}]")
+            categorized.append(info)
 
     except Exception as e:
         logger.error(f"Error in assign_file_category_pdf: {e}")
@@ -581,14 +2300,67 @@ def assign_file_category_pdf(extract_to: str, zip_folder_name: str) -> list:
     return categorized
 
 
+PARSED_PDFS_MAX = 4096                 # Classifications kept per process, least recently used dropped first
+PARSED_PDFS = collections.OrderedDict()   # {(sha256, backend, early stop, page budget): classification without a file name}
+
+def classify_pdf_copy(file_path: str, cache_path: str = None, backend: str = None, content_hash: str = None):
+    """
+    classify_pdf_file, parsing each content once per process: the result
+    is kept under `content_hash` without its file name, and every other
+    copy only re-applies the file name (the LIA country falls back to it).
+    """
+    if not content_hash:
+        return classify_pdf_file(file_path, cache_path, backend)
+
+    key = (content_hash, backend or dt.pdf_backend, dt.pdf_early_stop, dt.pdf_page_budget)
+    if key in PARSED_PDFS:
+        count("pdf_duplicates_reused")
+        PARSED_PDFS.move_to_end(key)
+    else:
+        PARSED_PDFS[key] = classify_pdf_file(file_path, cache_path, backend, content_hash, filename="")
+        if len(PARSED_PDFS) > PARSED_PDFS_MAX:
+            PARSED_PDFS.popitem(last=False)
+
+    info = PARSED_PDFS[key]
+    if info is None:
+        return None
+    info = dict(info, file=os.path.basename(file_path))
+    if info["subcategory"] == "LIA" and not info["amendment_number"]:
+        rules = dt.folder_categories[info["category"]][info["subcategory"]]
+        info["amendment_number"] = extract_lia_country("", rules.get("country_extraction", []), info["file"]).strip()
+    return info
+
+def classify_pdf_file(file_path: str, cache_path: str = None, backend: str = None,
+                      content_hash: str = None, filename: str = None):
+    """
+    Read the text of one PDF with `backend` (through the text cache when
+    `cache_path` is given), find its category in dt.folder_categories and
+    extract the anchor-defined date and trailing number (the country for
+    LIAs). Returns the metadata dict, or None when no category matches.
+    Does not touch the file.
+
+    Pages are read one at a time and scanned with scan_pdf_pages, at most
+    dt.pdf_page_budget of them. With dt.pdf_early_stop, reading stops as
+    soon as a category matched and every anchor it defines has a value.
+    A known `content_hash` saves hashing the file for the cache; `filename`
+    overrides the name reported and used for the LIA country fallback.
+    """
+    with contextlib.closing(iter_pdf_pages(file_path, cache_path, backend, content_hash)) as page_texts:
+        return scan_pdf_pages(page_texts, os.path.basename(file_path) if filename is None else filename,
+                              early_stop=dt.pdf_early_stop, page_budget=dt.pdf_page_budget)
+
+
 # # --------------------------------------------------------------------------------
 # --- Step: 2.3  Classification using filename heuristics --------------------------
 # # --------------------------------------------------------------------------------
+@timed_stage("step_2.filename_classification")
 def assign_file_category_filename(extract_to: str,
-                                  zip_folder_name: str) -> list:
+                                  zip_folder_name: str,
+                                  files: list) -> list:
     """
-    Classify files by filename keywords/extension, move them to the final
-    folder, extract dates, and fill 'amendment_number' either with:
+    Classify `files` (names in the CW folder root) by filename
+    keywords/extension with classify_filenames, which extracts dates and
+    fills 'amendment_number' either with:
       • the country (for LIA files)      – via extract_lia_country
       • the trailing number (other docs) – via extract_trailing_number
     Returns a list of metadata dictionaries.
@@ -596,75 +2368,9 @@ def assign_file_category_filename(extract_to: str,
     categorized: list = []
 
     try:
-        base_folder = os.path.join(extract_to, zip_folder_name)
-
-        # Search only in provisional Supporting / Uncategorized
-        for provisional in ["Supporting Documents", "Uncategorized"]:
-            prov_path = os.path.join(base_folder, provisional)
-            if not os.path.exists(prov_path):
-                continue
-
-            for file in os.listdir(prov_path):
-                file_path = os.path.join(prov_path, file)
-
-                # --- 1) Detect folder & file category -------------------
-                folder_category = file_category = None
-                file_lower      = file.lower()
-                file_ext        = file.split(".")[-1].lower() if "." in file else ""
-
-                trailing_terms  = []
-                country_terms   = []      # anchors for LIA (may remain empty)
-
-                for cat, subcats in dt.folder_categories.items():
-                    for subcat, rules in subcats.items():
-                        if file_ext == rules.get("extension", "") and any(
-                            kw in file_lower for kw in rules["keywords"]
-                        ):
-                            folder_category, file_category = cat, subcat
-                            trailing_terms = rules.get("trailing_number_extraction", [])
-                            country_terms  = rules.get("country_extraction", [])
-                            break
-                    if folder_category:
-                        break
-
-                # --- 2) Fallback rules ---------------------------------
-                if not folder_category and file_ext in ("pdf", "msg"):
-                    folder_category, file_category = "Supporting Documents", "Supporting Document"
-                    trailing_terms, country_terms = [], []
-                if not folder_category:
-                    folder_category, file_category = "Uncategorized", "Uncategorized"
-                    trailing_terms, country_terms = [], []
-
-                # --- 3) Extract metadata --------------------------------
-                file_date   = extract_date(file, [])   # date in filename
-                trailing_no = ""
-
-                if file_category == "LIA":
-                    trailing_no = extract_lia_country(
-                        text="",                        # no PDF text here
-                        patterns=country_terms,
-                        filename=file
-                    )
-                elif trailing_terms:
-                    trailing_no = extract_trailing_number(file, trailing_terms)
-
-                # --- 4) Move file to final folder -----------------------
-                dest_dir = os.path.join(base_folder, folder_category)
-                os.makedirs(dest_dir, exist_ok=True)
-                try:
-                    shutil.move(file_path, os.path.join(dest_dir, file))
-                    logger.debug(f"Moved '{file}' → '{folder_category}' [{file_category}]")
-                except Exception as move_err:
-                    logger.error(f"Error moving '{file}': {move_err}")
-
-                # --- 5) Append metadata ---------------------------------
-                categorized.append({
-                    "file"            : file,
-                    "category"        : folder_category,
-                    "subcategory"     : file_category,
-                    "date"            : file_date or "",
-                    "amendment_number": trailing_no.strip()
-                })
+        # PDFs and MSGs first, then the rest, in the order rows were always listed
+        files = sorted(files, key=lambda file: os.path.splitext(file)[-1].lower() not in (".pdf", ".msg"))
+        categorized = classify_filenames(files)
 
         logger.info(f"✅ File classification completed for {zip_folder_name}")
         logger.debug(f"Categorized {len(categorized)} files for {zip_folder_name} contract workspace.")
@@ -676,110 +2382,446 @@ def assign_file_category_filename(extract_to: str,
     return categorized
 
 # # --------------------------------------------------------------------------------
-# --- Step: 2.4  Trim long filenames AFTER classification --------------------------
+# --- Step: 2.4  Plan trimmed final names AFTER classification ---------------------
 # # --------------------------------------------------------------------------------
+def new_name_allocator(names=()) -> dict:
+    """
+    Free-name bookkeeping for one folder: the names taken (normcased, so
+    case-insensitive on Windows) and, per colliding name, the next numeric
+    suffix to try.
+    """
+    return {"taken": {os.path.normcase(name) for name in names}, "next": {}}
+
+def allocate_name(allocator: dict, name: str) -> str:
+    """
+    Reserve `name` in the allocator, or `base_N.ext` with the first N not
+    taken when it collides. Suffixes continue from the last one handed out
+    for the same name, so n files trimmed to one name cost O(n) lookups.
+    """
+    taken = allocator["taken"]
+    if os.path.normcase(name) in taken:
+        base, ext = os.path.splitext(name)
+        key = os.path.normcase(name)
+        counter = allocator["next"].get(key, 1)
+        while os.path.normcase(f"{base}_{counter}{ext}") in taken:
+            counter += 1
+        allocator["next"][key] = counter + 1
+        name = f"{base}_{counter}{ext}"
+    taken.add(os.path.normcase(name))
+    return name
+
+@timed_stage("step_2.trim")
 def trim_long_filenames(
-    file_resume: pd.DataFrame,
+    records: list,
     extract_to: str,
     zip_folder_name: str,
     logger: logging.Logger,
     max_len: int = 85,
-) -> pd.DataFrame:
+) -> list:
     """
-    Shorten filenames (excluding extension) to <= `max_len` characters
-    once files are in their final folders, renaming on disk and updating
-    the DataFrame so CSV export is consistent.
+    Shorten filenames (excluding extension) to <= `max_len` characters in
+    the placement plan, before anything is moved: each FileRecord gets the
+    final name its file is renamed to by place_files, with a numeric
+    suffix when the trimmed name is already taken in its category folder.
+
+    Every category folder is listed at most once; names are then allocated
+    in memory (see allocate_name), in record order, so the result is
+    deterministic.
     """
-    for idx, row in file_resume.iterrows():
-        original = row["File Original Name"]
+    allocators = {}
+    for record in records:
+        if record.category_folder not in allocators:
+            folder = os.path.join(extract_to, zip_folder_name, record.category_folder)
+            allocators[record.category_folder] = new_name_allocator(
+                os.listdir(folder) if os.path.isdir(folder) else ())
+        allocators[record.category_folder]["taken"].add(os.path.normcase(record.file_original_name))
+
+    for record in records:
+        original = record.file_original_name
         trimmed = trim_filename(original, max_len=max_len)
 
         if trimmed == original:
             continue  # no change needed
 
-        category = row["Category Folder"]
-        base_dir = os.path.join(extract_to, zip_folder_name, category)
-        old_path = os.path.join(base_dir, original)
-        new_path = os.path.join(base_dir, trimmed)
+        allocator = allocators[record.category_folder]
+        final = allocate_name(allocator, trimmed)
+        if final != trimmed:
+            logger.warning(f"Name collision avoided: '{final}'")
+        allocator["taken"].discard(os.path.normcase(original))
+        logger.debug(f"Renamed '{original}' → '{final}'")
+
+        # Update the record
+        record.file_original_name = final
+
+    return records
 
+# # --------------------------------------------------------------------------------
+# --- Step: 2.5  Move every file to its final folder and name ----------------------
+# # --------------------------------------------------------------------------------
+@timed_stage("step_2.placement")
+def place_files(extract_to: str, zip_folder_name: str, sources: list, records: list):
+    """
+    Carry out the placement plan: rename each file from the CW folder root
+    (`sources`, same order as `records`) straight into its category folder
+    under its final name. One rename per file.
+
+    Category folders are created when the first file is placed in them,
+    and only a folder created here that ends up with no file (every move
+    into it failed) is removed again, so no folder is listed or walked.
+    """
+    zip_folder_path = os.path.join(extract_to, zip_folder_name)
+    placed = {}   # Category folder created here → files moved into it
+
+    for source, record in zip(sources, records):
+        dest_dir = os.path.join(zip_folder_path, record.category_folder)
         try:
-            if not os.path.exists(old_path):
-                logger.warning(f"File not found: {old_path}")
+            if dest_dir not in placed and not os.path.isdir(dest_dir):
+                os.makedirs(dest_dir)
+                placed[dest_dir] = 0
+            os.rename(os.path.join(zip_folder_path, source),
+                      os.path.join(dest_dir, record.file_original_name))
+            if dest_dir in placed:
+                placed[dest_dir] += 1
+            logger.debug(f"Moved '{source}' → '{record.category_folder}'")
+        except Exception as e:
+            logger.error(f"Error moving '{source}' → '{dest_dir}': {e}")
+
+    for dest_dir, moved in placed.items():
+        if not moved:
+            try:
+                os.rmdir(dest_dir)
+            except OSError as err:
+                logger.warning(f"Could not remove {dest_dir}: {err}")
+    count("folders_created", len(placed))
+
+# ================================================================================
+# === DRY RUN: Placement plan from the ZIP central directories ====================
+# ================================================================================
+
+PLAN_REPORT_COLUMNS = (
+    "Contract Id",
+    "Archive Member",
+    "Size",
+    "Category Folder",
+    "File Category",
+    "Amendment Number",
+    "Extracted Date",
+    "Classified By",
+    "Final Path",
+)
+
+def list_zip_members(zip_ref: zipfile.ZipFile, members: dict, pdf_infos: dict, scratch: str, prefix: str = ""):
+    """
+    Record every member of an open archive under the flattened name it
+    would be extracted to (see extract_zip_members; a later member with
+    the same name replaces an earlier one) as {name: (member path, size)}.
+    Only the central directory is read, except for nested ZIPs (listed
+    through spool_nested_zip, as extract_zip_members reads them) and, when PDFs are classified by content,
+    PDFs: each is copied to `scratch`, classified into `pdf_infos` and
+    deleted right away.
+    """
+    for info in zip_ref.infolist():
+        file_name = zip_member_name(info)
+        if info.is_dir() or not file_name:
+            continue
+        member_path = prefix + info.filename
+
+        if file_name.lower().endswith('.zip'):
+            try:
+                with zip_ref.open(info) as src, spool_nested_zip(src, info.file_size) as buffer:
+                    with zipfile.ZipFile(buffer) as nested:
+                        list_zip_members(nested, members, pdf_infos, scratch, member_path + "/")
                 continue
+            except zipfile.BadZipFile:
+                logger.error(f"🔹❌ Bad nested ZIP file, kept as is: {file_name}")
+            except Exception as e:
+                logger.error(f"🔹❌ Error listing nested ZIP {file_name}, kept as is: {e}")
+                logger.error(traceback.format_exc())
 
-            # Handle collision if trimmed name already exists
-            if os.path.exists(new_path):
-                base, ext = os.path.splitext(trimmed)
-                counter = 1
-                while True:
-                    candidate = f"{base}_{counter}{ext}"
-                    candidate_path = os.path.join(base_dir, candidate)
-                    if not os.path.exists(candidate_path):
-                        new_path, trimmed = candidate_path, candidate
-                        break
-                    counter += 1
-                logger.warning(f"Name collision avoided: '{trimmed}'")
-
-            os.rename(old_path, new_path)
-            logger.debug(f"Renamed '{original}' → '{trimmed}'")
-
-            # Update DataFrame
-            file_resume.at[idx, "File Original Name"] = trimmed
+        members[file_name] = (member_path, info.file_size)
+        pdf_infos.pop(file_name, None)
+        if dt.classification_mode != "filename" and file_name.lower().endswith(".pdf"):
+            file_path = os.path.join(scratch, file_name)
+            try:
+                with zip_ref.open(info) as src:
+                    content_hash = write_copy(src, file_path)
+                info_pdf = classify_pdf_copy(file_path, None, dt.pdf_backend, content_hash)
+                if info_pdf is not None:
+                    pdf_infos[file_name] = info_pdf
+            except Exception as e:
+                logger.warning(f"Could not open PDF '{file_name}': {e}")
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
 
-        except Exception as e:
-            logger.error(f"Error trimming '{original}': {e}")
+def plan_archive(zip_path: str, zip_folder_name: str, extract_to: str) -> list:
+    """
+    Placement plan of one archive without extracting it: classify its
+    members from the listing (PDF content first, then filename rules, as
+    step_2 does) and plan trimmed final names under
+    <extract_to>/<zip_folder_name>. Returns report rows in
+    PLAN_REPORT_COLUMNS order; an unreadable archive gives none.
+    """
+    members, pdf_infos = {}, {}
+    try:
+        with zipfile.ZipFile(zip_path) as zip_ref, tempfile.TemporaryDirectory(prefix="plan_") as scratch:
+            list_zip_members(zip_ref, members, pdf_infos, scratch)
+    except zipfile.BadZipFile:
+        logger.error(f"🔹❌ Bad ZIP file: {zip_path}")
+        return []
+    except Exception as e:
+        logger.error(f"🔹❌ Error listing ZIP {zip_path}: {e}")
+        logger.error(traceback.format_exc())
+        return []
+
+    pdf_files = [pdf_infos[file] for file in members if file in pdf_infos]
+    categorized_files = pdf_files + assign_file_category_filename(
+        extract_to, zip_folder_name, [file for file in members if file not in pdf_infos])
+    records = build_file_records(zip_folder_name, categorized_files)
+    sources = [record.file_original_name for record in records]
+    records = trim_long_filenames(records, extract_to, zip_folder_name, logger)
+
+    missing_docs = missing_documents(records)
+    if missing_docs:
+        logger.warning(f"📋 {zip_folder_name}: Missing {' '.join(missing_docs)}")
+
+    return [(zip_folder_name, members[source][0], members[source][1], record.category_folder,
+             record.file_category, record.amendment_number, record.extracted_date,
+             "content" if source in pdf_infos else "filename",
+             os.path.normpath(os.path.join(extract_to, zip_folder_name, record.category_folder,
+                                           record.file_original_name)))
+            for source, record in zip(sources, records)]
+
+@timed_stage("dry_run")
+def plan_placement(source_path: str, dest_path: str) -> str:
+    """
+    Dry run: write the placement plan of every ZIP under source_path to
+    <dest_path>/<dt.dry_run_report> without extracting or moving anything.
+    Archives are found in the same order as Step 1, but every one is
+    planned, whether or not it was extracted before. With
+    classification_mode "filename", only central directories (and nested
+    ZIPs) are read. Returns the report path, or "" on invalid paths.
+    """
+    if not validate_paths(source_path, dest_path):
+        logger.critical("❌ Dry run failed: Invalid source or destination path.")
+        return ""
 
-    return file_resume
+    report_path = os.path.join(dest_path, dt.dry_run_report)
+    archives = files = 0
+    started = time.perf_counter()
+    with open(report_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh, lineterminator=os.linesep)
+        writer.writerow(PLAN_REPORT_COLUMNS)
+        for current_folder, dirs, names in os.walk(source_path):
+            extract_to = os.path.join(dest_path, os.path.relpath(current_folder, source_path))
+            for file_name in names:
+                if not file_name.lower().endswith('.zip'):
+                    continue
+                zip_path = os.path.join(current_folder, file_name)
+                try:
+                    rows = plan_archive(zip_path, os.path.splitext(file_name)[0], extract_to)
+                except Exception as e:
+                    logger.error(f"❌ Error planning ZIP {zip_path}: {e}")
+                    logger.error(traceback.format_exc())
+                    rows = []
+                writer.writerows(rows)
+                archives += 1
+                files += len(rows)
+                count("files_planned", len(rows))
+
+    logger.info(f"📋 Placement plan of {files} files from {archives} ZIP files "
+                f"in {time.perf_counter() - started:.2f}s → {report_path}")
+    return report_path
 
 # ====================================================================
 # === STEP 3: Merging all file_resume.csv & contract_resume.csv files=
 # ====================================================================
 
-def step_3(dest_path: str):
-    try:
-        logger.info("🔹📎 Step 3: Merging all file_resume.csv and contract_resume.csv files…")
+SUMMARY_READ_WORKERS = 8          # Per-workspace CSVs read concurrently by Step 3
+SUMMARY_READ_BATCH   = 64         # CSVs read per batch, so only one batch of rows is held at a time
+SUMMARY_PARQUET_ROWS = 100_000    # Rows buffered before each write to the Parquet dataset
 
-        # 1) Collect every individual CSV -----------------------------------
-        file_csvs     = glob.glob(os.path.join(dest_path, "**/file_resume.csv"),     recursive=True)
-        contract_csvs = glob.glob(os.path.join(dest_path, "**/contract_resume.csv"), recursive=True)
+def read_csv_rows(path: str) -> tuple:
+    """(header, rows) of one per-workspace CSV, every value kept as the string it was written as."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        return next(reader, []), list(reader)
 
-        # 2) Merge into global DataFrames -----------------------------------
-        all_files     = pd.concat([pd.read_csv(f) for f in file_csvs],     ignore_index=True) if file_csvs else pd.DataFrame()
-        all_contracts = pd.concat([pd.read_csv(f) for f in contract_csvs], ignore_index=True) if contract_csvs else pd.DataFrame()
+def csv_header(path: str) -> list:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return next(csv.reader(fh), [])
 
-        all_files.drop_duplicates(inplace=True)
-        all_contracts.drop_duplicates(inplace=True)
+def iter_csv_files(paths: list):
+    """Yield (header, rows) for every CSV in `paths`, in order, reading each batch in parallel."""
+    with ThreadPoolExecutor(max_workers=SUMMARY_READ_WORKERS) as pool:
+        for start in range(0, len(paths), SUMMARY_READ_BATCH):
+            yield from pool.map(read_csv_rows, paths[start:start + SUMMARY_READ_BATCH])
+
+def merge_summary_csvs(out_path: str, paths: list, key_column: str, replaced: set = None,
+                       parquet_path: str = None) -> int:
+    """
+    Stream the CSVs in `paths` into `out_path` under the union of their
+    headers (in order of first appearance) and drop repeated rows with a
+    set of 16-byte row hashes, so memory grows with the number of distinct
+    rows, not with their size. With `replaced` (incremental merge), the
+    rows of the existing `out_path` whose `key_column` is not in `replaced`
+    are kept in front. The result is written to a temporary file and
+    swapped in. With `parquet_path`, the rows read from `paths` are also
+    written to a Parquet dataset partitioned by `key_column`; when that
+    dataset does not exist yet, the kept rows go into it too, so it starts
+    out with every workspace.
+
+    Returns the number of rows written.
+    """
+    previous = out_path if replaced is not None else None
+    columns = {}
+    for path in ([previous] if previous else []) + list(paths):
+        columns.update(dict.fromkeys(csv_header(path)))
+    columns = list(columns)
+
+    seen, written = set(), 0
+    parquet_all = bool(parquet_path) and (replaced is None or not os.path.isdir(parquet_path))
+    parquet = new_parquet_writer(parquet_path, columns, key_column, None if parquet_all else replaced) if parquet_path else None
+
+    def write_rows(header: list, rows, keep=None):
+        nonlocal written
+        positions = [header.index(column) if column in header else None for column in columns]
+        for row in rows:
+            values = [row[i] if i is not None and i < len(row) else "" for i in positions]
+            if keep is not None and not keep(values):
+                continue
+            digest = hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=16).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            writer.writerow(values)
+            written += 1
+            if parquet is not None and (keep is None or parquet_all):
+                add_parquet_row(parquet, values)
+
+    temp_path = out_path + ".tmp"
+    try:
+        with open(temp_path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh, lineterminator=os.linesep)
+            writer.writerow(columns)
+
+            if previous:
+                key = columns.index(key_column) if key_column in columns else None
+                with open(previous, newline="", encoding="utf-8") as prev:
+                    reader = csv.reader(prev)
+                    write_rows(next(reader, []), reader,
+                               keep=lambda values: key is None or values[key] not in replaced)
+
+            for header, rows in iter_csv_files(list(paths)):
+                write_rows(header, rows)
+
+        if parquet is not None:
+            flush_parquet(parquet)
+        os.replace(temp_path, out_path)
+    finally:
+        # A failed merge leaves the previous global CSV untouched and no temporary file behind
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return written
+
+def parquet_available() -> bool:
+    """True when pyarrow can be imported, checked before any Parquet dataset is touched."""
+    try:
+        import pyarrow.dataset # This module writes partitioned Parquet datasets
+    except ImportError as e:
+        logger.warning(f"summary_parquet is set but pyarrow is not available ({e}); writing the CSVs only")
+        return False
+    return True
+
+def new_parquet_writer(parquet_path: str, columns: list, key_column: str, replaced: set = None) -> dict:
+    """
+    Start (re)writing the Parquet dataset at `parquet_path`, one hive
+    partition ("<key_column>=<value>" folder) per workspace. A full merge
+    starts from scratch; an incremental one only drops the partitions of
+    the `replaced` workspaces. Needs pyarrow.
+    """
+    import urllib.parse # This module decodes the partition values pyarrow writes in folder names
+
+    if replaced is None:
+        shutil.rmtree(parquet_path, ignore_errors=True)
+    elif os.path.isdir(parquet_path):
+        for entry in os.listdir(parquet_path):
+            field, _, value = entry.partition("=")
+            if field == key_column and urllib.parse.unquote(value) in replaced:
+                shutil.rmtree(os.path.join(parquet_path, entry), ignore_errors=True)
+    os.makedirs(parquet_path, exist_ok=True)
+    return {"path": parquet_path, "columns": columns, "key": key_column,
+            "rows": [], "writes": 0, "run": time.time_ns()}
+
+def add_parquet_row(parquet: dict, values: list):
+    parquet["rows"].append(values)
+    if len(parquet["rows"]) >= SUMMARY_PARQUET_ROWS:
+        flush_parquet(parquet)
+
+def flush_parquet(parquet: dict):
+    """Append the buffered rows to the dataset as new files (string columns)."""
+    import pyarrow as pa # This module provides columnar tables for the optional Parquet output
+    import pyarrow.dataset as pa_dataset # This module writes partitioned Parquet datasets
+
+    if not parquet["rows"]:
+        return
+    table = pa.table({column: [row[i] for row in parquet["rows"]]
+                      for i, column in enumerate(parquet["columns"])})
+    pa_dataset.write_dataset(
+        table, parquet["path"], format="parquet",
+        partitioning=[parquet["key"]], partitioning_flavor="hive",
+        basename_template=f"part-{parquet['run']}-{parquet['writes']}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    parquet["writes"] += 1
+    parquet["rows"] = []
+
+@timed_stage("step_3")
+def step_3(dest_path: str, workspaces: list = None):
+    """
+    Merge the per-workspace CSVs into File_Resume.csv / Contract_Resume.csv
+    with merge_summary_csvs, streaming rows instead of loading every CSV.
+
+    When `workspaces` is given and both global CSVs exist, only those
+    workspaces are merged: their previous rows are replaced and every
+    other row is kept as is. Otherwise every CSV under dest_path is merged.
+    With dt.summary_parquet, File_Resume.parquet / Contract_Resume.parquet
+    datasets partitioned by contract are written next to them, or only the
+    CSVs (with a warning) when pyarrow is missing.
+    """
+    try:
+        logger.info("🔹📎 Step 3: Merging all file_resume.csv and contract_resume.csv files…")
 
         out_files = os.path.join(dest_path, "File_Resume.csv")
         out_conts = os.path.join(dest_path, "Contract_Resume.csv")
-        all_files.to_csv(out_files, index=False)
-        all_contracts.to_csv(out_conts, index=False)
+        incremental = workspaces is not None and os.path.exists(out_files) and os.path.exists(out_conts)
+
+        # 1) Collect every individual CSV -----------------------------------
+        if incremental:
+            logger.info(f"🔹📎 Incremental merge of {len(workspaces)} changed workspaces")
+            file_csvs     = [p for ws in workspaces if os.path.exists(p := os.path.join(dest_path, ws, "file_resume.csv"))]
+            contract_csvs = [p for ws in workspaces if os.path.exists(p := os.path.join(dest_path, ws, "contract_resume.csv"))]
+        else:
+            file_csvs     = glob.glob(os.path.join(dest_path, "**/file_resume.csv"),     recursive=True)
+            contract_csvs = glob.glob(os.path.join(dest_path, "**/contract_resume.csv"), recursive=True)
+
+        # 2) Stream into the global CSVs -------------------------------------
+        replaced = {str(ws) for ws in workspaces} if incremental else None
+        parquet = dt.summary_parquet and parquet_available()
+        parquet_files = os.path.join(dest_path, "File_Resume.parquet") if parquet else None
+        parquet_conts = os.path.join(dest_path, "Contract_Resume.parquet") if parquet else None
+
+        file_rows     = merge_summary_csvs(out_files, file_csvs, "Contract Id", replaced, parquet_files)
+        contract_rows = merge_summary_csvs(out_conts, contract_csvs, "Contract_id", replaced, parquet_conts)
+        count("rows_merged", file_rows)
 
         logger.info("✅ Global CSVs saved.")
         logger.info(f"📁 File_Resume.csv      → {out_files}")
         logger.info(f"📁 Contract_Resume.csv  → {out_conts}")
-        logger.info(f"🧮 Total rows – Files: {len(all_files)} | Contracts: {len(all_contracts)}")
-
-        # 3) Remove empty folders inside each CW ----------------------------
-        logger.info("Removing empty folders inside every contract workspace…")
-
-        # Walk each CW folder (first-level subfolders of dest_path)
-        for cw in [d for d in os.listdir(dest_path) if os.path.isdir(os.path.join(dest_path, d))]:
-            cw_path = os.path.join(dest_path, cw)
-
-            # Walk bottom-up so inner empty dirs are removed before parents
-            for root, dirs, _ in os.walk(cw_path, topdown=False):
-                for d in dirs:
-                    dir_path = os.path.join(root, d)
-                    # If directory is empty (no files and no subdirs) → delete
-                    if not os.listdir(dir_path):
-                        try:
-                            os.rmdir(dir_path)
-                        except OSError as err:
-                            logger.warning(f"Could not remove {dir_path}: {err}")
-
-        logger.info("✅ Empty-folder cleanup finished.")
+        if parquet:
+            logger.info(f"📁 Parquet datasets     → {parquet_files}, {parquet_conts}")
+        logger.info(f"🧮 Total rows – Files: {file_rows} | Contracts: {contract_rows}")
 
     except Exception as e:
         logger.error(f"❌ Error during Step 3: {e}")
-        logger.error(traceback.format_exc())
\ No newline at end of file
+        logger.error(traceback.format_exc())
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 import traceback
 import functions as fn
 import data as dt
@@ -7,41 +8,66 @@ def main():
     # Setup logger
     log = fn.setup_log()
     log.info("🔹 Starting the File Organizer Process...")
+    profiler = fn.start_profiler()
 
-    # 🔹 Step 1: Main Folder Processing
     try:
-        log.info("🔹 Step 1: Starting the main folder processing...")
-        zip_names = fn.step_1(dt.source_path, dt.dest_path)
-        log.debug("✅ Step 1 Completed: Main folder processed successfully.")
-
-        if not zip_names:
-            log.critical("❌ No ZIP files were found to extract. Exiting process.")
+        # 🔹 Dry run: report the placement plan, extract and move nothing
+        if dt.dry_run:
+            log.info("🔹 Dry run: planning the placement from the ZIP listings...")
+            try:
+                fn.plan_placement(dt.source_path, dt.dest_path)
+            except Exception as e:
+                log.error(f"❌ Error during the dry run: {e}")
+                log.error(traceback.format_exc())
             return
 
-        # 🔹 Step 2: Assigning and Moving Files
+        # 🔹 Step 1: Main Folder Processing
         try:
-            log.info("🔹 Step 2: Assigning and Moving Files...")
-            for zip_name in zip_names:
-                fn.step_2(dt.dest_path, zip_name)
-            log.info("✅ Step 2 Completed: All files processed.")
+            if dt.pipelined:
+                log.info("🔹 Steps 1-2: Extracting and classifying each ZIP as soon as it is ready...")
+                zip_names, results = fn.run_pipeline(dt.source_path, dt.dest_path)
+            else:
+                log.info("🔹 Step 1: Starting the main folder processing...")
+                zip_names = fn.step_1(dt.source_path, dt.dest_path)
+            log.debug("✅ Step 1 Completed: Main folder processed successfully.")
 
-            # 🔹 Step 3: Renaming Files Accordingly
+            if not zip_names:
+                log.critical("❌ No ZIP files were found to extract. Exiting process.")
+                return
+
+            # 🔹 Step 2: Assigning and Moving Files
             try:
-                log.info("🔹 Step 3: Summarizing.")
-                fn.step_3(dt.dest_path)
-                log.info("✅ Step 3 Completed: All files renamed successfully.")
+                if not dt.pipelined:
+                    log.info("🔹 Step 2: Assigning and Moving Files...")
+                    results = fn.run_step_2(dt.dest_path, zip_names, max_workers=dt.max_workers)
+                fn.record_manifest_rows(dt.dest_path, results)
+                log.info("✅ Step 2 Completed: All files processed.")
+
+                # 🔹 Step 3: Renaming Files Accordingly
+                try:
+                    log.info("🔹 Step 3: Summarizing.")
+                    fn.step_3(dt.dest_path, workspaces=list(zip_names) if dt.incremental_runs else None)
+                    log.info("✅ Step 3 Completed: All files renamed successfully.")
+
+                except Exception as e:
+                    log.error(f"❌ Error in Step 3 while renaming files: {e}")
+                    log.error(traceback.format_exc())
 
             except Exception as e:
-                log.error(f"❌ Error in Step 3 while renaming files: {e}")
+                log.error(f"❌ Error in Step 2 while categorizing files: {e}")
                 log.error(traceback.format_exc())
 
         except Exception as e:
-            log.error(f"❌ Error in Step 2 while categorizing files: {e}")
+            log.error(f"❌ Error in Step 2 during folder processing: {e}")
             log.error(traceback.format_exc())
 
-    except Exception as e:
-        log.error(f"❌ Error in Step 2 during folder processing: {e}")
-        log.error(traceback.format_exc())
+    finally:
+        fn.finish_catalog_run(dt.dest_path)
+        # The profile and the metrics are written under dest_path, which may not exist
+        if os.path.isdir(dt.dest_path):
+            fn.stop_profiler(profiler, dt.dest_path, "main")
+            if dt.metrics_enabled and not dt.dry_run:
+                fn.write_metrics(dt.dest_path)
 
 
 if __name__ == "__main__":